@@ -0,0 +1,153 @@
+"""
+Benchmark for the vector store behind /ask: Chroma (pc_parts_vector_db_free) vs the
+in-memory NumPy matrix store (rag/matrix_store.py) exported from it.
+
+For each query vector it runs the same searches HybridRetriever makes (unfiltered and
+per-category metadata filters) against both stores and reports latency (mean/p50/p95)
+and recall@k: the share of Chroma's top-k that the matrix store also returns. The
+matrix search is exact, so anything below 1.0 is Chroma's HNSW approximation (or ties).
+
+Queries are the sample questions below embedded with the MiniLM model; without
+sentence-transformers installed, stored part vectors with added noise are used instead.
+--scale=N also times the matrix store alone on N synthetic rows (e.g. 100000).
+
+    python bench_retriever.py [k] [rounds] [--scale=N]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from rag.chain import EMBEDDING_MODEL, load_vectorstore
+from rag.intent import parse_intent
+from rag.matrix_store import MatrixVectorStore, export_from_chroma, write_matrix_store
+from rag.retriever import metadata_filter
+
+QUESTIONS = [
+    "gaming PC under 80000",
+    "best AM5 CPU for streaming",
+    "DDR5 RAM 32GB",
+    "quiet power supply 750W",
+    "budget graphics card for 1080p",
+    "LGA1700 motherboard with wifi",
+    "fast NVMe SSD 1TB",
+    "video editing workstation build",
+]
+
+
+def query_vectors(chroma, count: int) -> List[List[float]]:
+    try:
+        from rag.chain import load_embeddings
+        embeddings = load_embeddings(cached=False)
+        print(f"Queries: {len(QUESTIONS)} sample questions embedded with {EMBEDDING_MODEL}")
+        return embeddings.embed_documents(QUESTIONS)
+    except ImportError:
+        stored = np.asarray(chroma.get(include=["embeddings"])["embeddings"], dtype=np.float32)
+        rng = np.random.default_rng(0)
+        picked = stored[rng.choice(len(stored), size=min(count, len(stored)), replace=False)]
+        print(f"Queries: {len(picked)} stored part vectors + noise (embedding model not installed)")
+        return (picked + rng.normal(0, 0.02, picked.shape).astype(np.float32)).tolist()
+
+
+def searches(vectors: List[List[float]]) -> List[Dict]:
+    """(vector, filter) pairs: one unfiltered search plus one per category the question targets."""
+    cases = []
+    for n, vector in enumerate(vectors):
+        cases.append({"vector": vector, "filter": None})
+        intent = parse_intent(QUESTIONS[n % len(QUESTIONS)])
+        for category in intent.categories:
+            cases.append({"vector": vector, "filter": metadata_filter(category, intent)})
+    return cases
+
+
+def timed(search: Callable, cases: List[Dict], k: int, rounds: int):
+    latencies, results = [], []
+    for _ in range(rounds):
+        results = []
+        for case in cases:
+            started = time.perf_counter()
+            hits = search(case["vector"], k=k, filter=case["filter"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append([doc.page_content for doc in hits])
+    return latencies, results
+
+
+def summary(latencies: List[float]) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean {statistics.mean(ordered):7.3f} ms  p50 {statistics.median(ordered):7.3f} ms  p95 {p95:7.3f} ms"
+
+
+def recall(expected: List[List[str]], found: List[List[str]]) -> float:
+    scores = [len(set(a) & set(b)) / len(a) for a, b in zip(expected, found) if a]
+    return statistics.mean(scores) if scores else 1.0
+
+
+def bench_scale(rows: int, dim: int, k: int, rounds: int, metadatas: List[Dict]):
+    """Matrix-store latency on a synthetic catalog of `rows` parts (metadata cycled from the real one)."""
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as path:
+        write_matrix_store(
+            path,
+            [f"synthetic-{n}" for n in range(rows)],
+            rng.normal(size=(rows, dim)).astype(np.float32),
+            [""] * rows,
+            [metadatas[n % len(metadatas)] for n in range(rows)] if metadatas else [{}] * rows,
+        )
+        store = MatrixVectorStore(path)
+        queries = rng.normal(size=(rounds, dim)).astype(np.float32)
+        for where in (None, {"category": "CPU"}):
+            store.search(queries[0], k, where)  # builds the metadata column outside the timing
+            latencies = []
+            for query in queries:
+                started = time.perf_counter()
+                store.search(query, k, where)
+                latencies.append((time.perf_counter() - started) * 1000)
+            label = "unfiltered" if where is None else f"filter {where}"
+            print(f"  matrix @ {rows:,} rows, {label:<25} {summary(latencies)}")
+
+
+def main(k: int = 8, rounds: int = 20, scale: Optional[int] = None):
+    chroma = load_vectorstore(None)
+    with tempfile.TemporaryDirectory() as path:
+        started = time.perf_counter()
+        export_from_chroma(chroma, path, EMBEDDING_MODEL)
+        matrix = MatrixVectorStore(path)
+        print(f"Exported {len(matrix)} vectors to the matrix store in {time.perf_counter() - started:.2f}s "
+              f"({os.path.getsize(os.path.join(path, 'vectors.f32')) / 1e6:.1f} MB)")
+
+        cases = searches(query_vectors(chroma, len(QUESTIONS)))
+        # Warm both stores (Chroma loads its HNSW index, the matrix store its metadata columns)
+        timed(chroma.similarity_search_by_vector, cases, k, 1)
+        timed(matrix.similarity_search_by_vector, cases, k, 1)
+
+        print(f"\n{len(cases)} searches x {rounds} rounds, k={k}")
+        for label, filtered in (("unfiltered", False), ("filtered", True)):
+            subset = [case for case in cases if (case["filter"] is not None) == filtered]
+            if not subset:
+                continue
+            chroma_ms, chroma_hits = timed(chroma.similarity_search_by_vector, subset, k, rounds)
+            matrix_ms, matrix_hits = timed(matrix.similarity_search_by_vector, subset, k, rounds)
+            print(f"  {label} ({len(subset)} searches)")
+            print(f"    chroma  {summary(chroma_ms)}")
+            print(f"    matrix  {summary(matrix_ms)}  "
+                  f"speedup x{statistics.median(chroma_ms) / statistics.median(matrix_ms):.1f}")
+            print(f"    recall@{k} of matrix vs chroma: {recall(chroma_hits, matrix_hits):.3f}")
+
+        if scale:
+            print("\nScale test")
+            bench_scale(scale, matrix.matrix.shape[1], k, rounds * 5, matrix.metadatas)
+
+
+if __name__ == "__main__":
+    options = [arg for arg in sys.argv[1:] if arg.startswith("--scale=")]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(
+        int(args[0]) if args else 8,
+        int(args[1]) if len(args) > 1 else 20,
+        int(options[0].split("=", 1)[1]) if options else None,
+    )
@@ -0,0 +1,70 @@
+"""
+Benchmark for catalog list serialization.
+
+Compares the model-based path (PCPart(**doc) per document, FastAPI response_model
+validation, jsonable_encoder, JSONResponse rendering) with the raw path in
+serialization.py (projected documents -> orjson bytes) on a 100-item page.
+
+    python bench_serialization.py [page_size] [rounds]
+"""
+import json
+import sys
+import timeit
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from models.part import PCPart
+from serialization import PART_FIELDS, dumps_parts
+from spec_parser import parse_part
+
+
+def load_page(page_size: int) -> List[dict]:
+    """A page of realistic part documents built from database.json."""
+    with open("database.json", "r", encoding="utf-8") as f:
+        items = json.load(f)
+    docs = []
+    while len(docs) < page_size:
+        for item in items[: page_size - len(docs)]:
+            doc = parse_part(item)
+            doc["_id"] = ObjectId()
+            docs.append({field: doc.get(field) for field in PART_FIELDS})
+    return docs
+
+
+_parts_adapter = TypeAdapter(List[PCPart])
+
+
+def model_path(docs: List[dict]) -> bytes:
+    parts = [PCPart(**doc) for doc in docs]
+    # What FastAPI does with response_model=List[PCPart] before rendering
+    validated = _parts_adapter.validate_python(parts)
+    return JSONResponse(content=jsonable_encoder(validated)).body
+
+
+def raw_path(docs: List[dict]) -> bytes:
+    return dumps_parts(docs)
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    docs = load_page(page_size)
+
+    assert json.loads(model_path(docs)) == json.loads(raw_path(docs)), "serialization paths disagree"
+
+    results = {}
+    for name, fn in (("model (PCPart + jsonable_encoder)", model_path), ("raw (projection + orjson)", raw_path)):
+        best = min(timeit.repeat(lambda: fn(docs), number=rounds, repeat=5)) / rounds
+        results[name] = best
+        print(f"{name:<36} {best * 1e6:10.1f} µs/page")
+
+    model_time, raw_time = results.values()
+    print(f"speedup: {model_time / raw_time:.1f}x for {page_size} parts per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from database import ensure_indexes
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
 DEMO_USERNAME = os.getenv("DEMO_USERNAME", "demo")
 DEMO_PASSWORD = os.getenv("DEMO_PASSWORD", "demo123")
@@ -18,12 +20,6 @@ DEMO_EMAIL = os.getenv("DEMO_EMAIL", "demo@example.com")
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 
-async def ensure_indexes(db):
-    await db.users.create_index("username", unique=True)
-    await db.users.create_index("email", unique=True, sparse=True)
-    await db.builds.create_index([("user_id", 1), ("status", 1)])
-
-
 async def ensure_demo_user(db) -> ObjectId:
     existing = await db.users.find_one({"username": DEMO_USERNAME})
     if existing:
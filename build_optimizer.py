@@ -0,0 +1,267 @@
+"""
+Deterministic budget build optimizer.
+
+Fills one part per category slot so that the whole build passes the rules in
+compatibility.py, stays within budget and maximizes a use-case weighted score.
+The search is a depth-first branch-and-bound:
+- parts dominated within their compatibility group (same socket/ram_type/form
+  factor/power/clearance values, but pricier and no better) are dropped up front,
+- each slot walks its parts best-score first and confirms them lazily with
+  compatibility.check_part, so most of a socket/RAM-type group that doesn't fit
+  the partial build is never even checked,
+- a branch is cut when the cheapest completion exceeds the budget, or when the
+  best score it could still reach can't beat the current top-K. That bound is
+  the LP relaxation of the remaining slots: spend what is left greedily along
+  each category's upper price/score hull, best score-per-rupee first.
+"""
+import heapq
+from bisect import bisect_right
+import os
+from collections import defaultdict
+from itertools import count
+from typing import Dict, List, Literal, NamedTuple, Optional, Sequence, Tuple, get_args
+
+from compatibility import BuildParts, canonical_category, check_part, evaluate_parts, summarize
+from models.part import PCPart
+
+# Slot order: parts with the most compatibility constraints first, PSU last so
+# its wattage check sees every power-drawing part
+SLOT_ORDER = ("CPU", "Motherboard", "RAM", "GPU", "Storage", "Case", "PSU")
+
+UseCase = Literal["gaming", "workstation", "office", "balanced"]
+USE_CASES = get_args(UseCase)
+
+# How much each slot contributes to the build score, per use case
+USE_CASE_WEIGHTS: Dict[str, Dict[str, float]] = {
+    "gaming": {"GPU": 0.40, "CPU": 0.20, "RAM": 0.10, "Storage": 0.10, "Motherboard": 0.08, "PSU": 0.06, "Case": 0.06},
+    "workstation": {"CPU": 0.35, "RAM": 0.18, "GPU": 0.17, "Storage": 0.14, "Motherboard": 0.08, "PSU": 0.04, "Case": 0.04},
+    "office": {"CPU": 0.25, "Storage": 0.25, "RAM": 0.20, "Motherboard": 0.10, "PSU": 0.10, "GPU": 0.05, "Case": 0.05},
+    "balanced": {"GPU": 0.28, "CPU": 0.22, "RAM": 0.12, "Storage": 0.12, "Motherboard": 0.10, "PSU": 0.08, "Case": 0.08},
+}
+
+# Spec fields that measure performance beyond price tier
+PERFORMANCE_FIELDS = {"CPU": "cores"}
+
+# Search effort cap; past it the best builds found so far are returned (exhaustive=False)
+OPTIMIZER_MAX_NODES = int(os.getenv("OPTIMIZER_MAX_NODES", "200000"))
+
+# Fields that decide compatibility; parts sharing all of them are interchangeable for the rules
+_COMPATIBILITY_FIELDS = ("socket", "ram_type", "form_factor", "tdp", "wattage", "length_mm", "max_gpu_length_mm")
+
+
+class OptimizedBuild(NamedTuple):
+    score: float
+    total_price: float
+    parts: List[PCPart]
+
+
+class OptimizeResult(NamedTuple):
+    builds: List[OptimizedBuild]
+    nodes: int  # search nodes expanded
+    exhaustive: bool  # False when the node cap stopped the search early
+
+
+def _normalized(values: List[float]) -> List[float]:
+    low, high = min(values), max(values)
+    return [(v - low) / (high - low) if high > low else 1.0 for v in values]
+
+
+def performance_metrics(parts: List[PCPart]) -> Dict[object, float]:
+    """
+    0..1 performance estimate per part within its category: the normalized price
+    tier, averaged with a normalized spec (e.g. CPU cores) where the category has one.
+    """
+    metrics: Dict[object, float] = {}
+    by_category: Dict[str, List[PCPart]] = defaultdict(list)
+    for part in parts:
+        by_category[canonical_category(part.category)].append(part)
+
+    for category, members in by_category.items():
+        scores = _normalized([p.price for p in members])
+        field = PERFORMANCE_FIELDS.get(category)
+        if field and all(getattr(p, field) for p in members):
+            spec_scores = _normalized([float(getattr(p, field)) for p in members])
+            scores = [(a + b) / 2 for a, b in zip(scores, spec_scores)]
+        for part, score in zip(members, scores):
+            metrics[part.id] = score
+    return metrics
+
+
+def pareto_prune(parts: List[PCPart], metrics: Dict[object, float]) -> List[PCPart]:
+    """Within each compatibility group keep only parts that no cheaper-or-equal part outperforms."""
+    groups: Dict[Tuple, List[PCPart]] = defaultdict(list)
+    for part in parts:
+        key = (canonical_category(part.category),) + tuple(getattr(part, f) for f in _COMPATIBILITY_FIELDS)
+        groups[key].append(part)
+
+    kept: List[PCPart] = []
+    for members in groups.values():
+        best = -1.0
+        for part in sorted(members, key=lambda p: (p.price, -metrics[p.id])):
+            if metrics[part.id] > best:
+                kept.append(part)
+                best = metrics[part.id]
+    return kept
+
+
+def _upper_hull_segments(points: List[Tuple[float, float]], start: Tuple[float, float]) -> List[Tuple[float, float]]:
+    """(extra price, extra metric) steps along the upper concave hull of `points`, starting at `start`."""
+    hull = [start]
+    for price, metric in sorted(points):
+        if metric <= hull[-1][1]:
+            continue
+        # Pop points that fall under the line from their predecessor to the new point
+        while len(hull) >= 2:
+            (x1, y1), (x2, y2) = hull[-2], hull[-1]
+            if (y2 - y1) * (price - x1) <= (metric - y1) * (x2 - x1):
+                hull.pop()
+            else:
+                break
+        hull.append((price, metric))
+    return [(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(hull, hull[1:])]
+
+
+class BuildOptimizer:
+    """Precomputed search structures over one catalog snapshot."""
+
+    def __init__(self, parts: List[PCPart], source=None):
+        self.source = source
+        self.metrics = performance_metrics(parts)
+        by_category: Dict[str, List[PCPart]] = defaultdict(list)
+        for part in pareto_prune(parts, self.metrics):
+            by_category[canonical_category(part.category)].append(part)
+
+        # Per category: parts best-first, cheapest price, best metric at that
+        # price, and the upper hull segments (extra rupees, extra metric) above it
+        self._ranked: Dict[str, List[PCPart]] = {}
+        self._neg_prefix_min: Dict[str, List[float]] = {}  # -(cheapest price among ranked[:k+1]), ascending
+        self._min_price: Dict[str, float] = {}
+        self._base_metric: Dict[str, float] = {}
+        self._segments: Dict[str, List[Tuple[float, float]]] = {}
+        for category, members in by_category.items():
+            self._ranked[category] = sorted(members, key=lambda p: (-self.metrics[p.id], p.price))
+            running, prefix = float("inf"), []
+            for part in self._ranked[category]:
+                running = min(running, part.price)
+                prefix.append(-running)
+            self._neg_prefix_min[category] = prefix
+            cheapest = min(p.price for p in members)
+            base = max(self.metrics[p.id] for p in members if p.price == cheapest)
+            self._min_price[category] = cheapest
+            self._base_metric[category] = base
+            self._segments[category] = _upper_hull_segments(
+                [(p.price, self.metrics[p.id]) for p in members if p.price > cheapest], (cheapest, base))
+
+    @property
+    def categories(self) -> List[str]:
+        return [category for category in SLOT_ORDER if category in self._ranked]
+
+    def optimize(
+        self,
+        budget: float,
+        use_case: str = "gaming",
+        top_k: int = 3,
+        categories: Optional[Sequence[str]] = None,
+        max_nodes: int = OPTIMIZER_MAX_NODES,
+    ) -> OptimizeResult:
+        """The top-K compatible builds within budget, best score first."""
+        weights = USE_CASE_WEIGHTS[use_case]
+        wanted = {canonical_category(c) for c in categories} if categories else set(SLOT_ORDER)
+        slots = [category for category in self.categories if category in wanted]
+        if not slots:
+            return OptimizeResult([], 0, True)
+
+        # For slots i..: cheapest possible spend, score of the cheapest parts, and
+        # every weighted hull segment sorted by score per rupee, as running totals
+        # of (rupees, score) so the greedy fill is a bisect
+        min_rest = [0.0] * (len(slots) + 1)
+        base_rest = [0.0] * (len(slots) + 1)
+        segments_rest: List[List[Tuple[float, float]]] = [[] for _ in range(len(slots) + 1)]
+        spent_rest: List[List[float]] = [[] for _ in range(len(slots) + 1)]
+        gained_rest: List[List[float]] = [[] for _ in range(len(slots) + 1)]
+        for i in range(len(slots) - 1, -1, -1):
+            category, weight = slots[i], weights.get(slots[i], 0.0)
+            min_rest[i] = min_rest[i + 1] + self._min_price[category]
+            base_rest[i] = base_rest[i + 1] + weight * self._base_metric[category]
+            weighted = [(cost, weight * gain) for cost, gain in self._segments[category]]
+            segments_rest[i] = sorted(segments_rest[i + 1] + weighted, key=lambda s: s[1] / s[0], reverse=True)
+            spent, gained = 0.0, 0.0
+            for cost, gain in segments_rest[i]:
+                spent += cost
+                gained += gain
+                spent_rest[i].append(spent)
+                gained_rest[i].append(gained)
+
+        top: List[Tuple[float, float, int, BuildParts]] = []  # min-heap of (score, -price, tiebreak, parts)
+        tiebreak = count()
+        nodes = 0
+
+        def upper_bound(i: int, remaining: float) -> float:
+            money = remaining - min_rest[i]
+            if money <= 0:
+                return base_rest[i]
+            spent, gained = spent_rest[i], gained_rest[i]
+            full = bisect_right(spent, money)  # segments bought outright
+            bound = base_rest[i] + (gained[full - 1] if full else 0.0)
+            if full < len(spent):
+                cost, gain = segments_rest[i][full]
+                bound += gain * (money - (spent[full - 1] if full else 0.0)) / cost
+            return bound
+
+        def search(i: int, build_parts: BuildParts, cost: float, score: float):
+            nonlocal nodes
+            nodes += 1
+            if i == len(slots):
+                entry = (score, -cost, next(tiebreak), build_parts)
+                if len(top) < top_k:
+                    heapq.heappush(top, entry)
+                elif entry[:2] > top[0][:2]:
+                    heapq.heapreplace(top, entry)
+                return
+
+            remaining = budget - cost
+            if min_rest[i] > remaining:
+                return
+            if len(top) == top_k and score + upper_bound(i, remaining) <= top[0][0]:
+                return
+
+            category = slots[i]
+            weight = weights.get(category, 0.0)
+            affordable = remaining - min_rest[i + 1]
+            # Best first; once a part fails this bound no later (lower-scoring) one can pass it
+            rest_bound = upper_bound(i + 1, remaining - self._min_price[category])
+            # Skip the leading run of parts that are all over the allowance
+            first = bisect_right(self._neg_prefix_min[category], -affordable - 1e-9)
+            for part in self._ranked[category][first:]:
+                if nodes >= max_nodes:
+                    return
+                gain = weight * self.metrics[part.id]
+                if len(top) == top_k and score + gain + rest_bound <= top[0][0]:
+                    break
+                if part.price > affordable:
+                    continue
+                if len(top) == top_k and score + gain + upper_bound(i + 1, remaining - part.price) <= top[0][0]:
+                    continue
+                if check_part(part, build_parts):
+                    continue
+                search(i + 1, build_parts + [(part, 1)], cost + part.price, score + gain)
+
+        search(0, [], 0.0, 0.0)
+        builds = [
+            OptimizedBuild(round(score, 4), round(-neg_price, 2), [part for part, _ in build_parts])
+            for score, neg_price, _, build_parts in sorted(top, reverse=True)
+        ]
+        return OptimizeResult(builds, nodes, nodes < max_nodes)
+
+
+def describe_build(build: OptimizedBuild) -> Dict[str, object]:
+    """API shape of one optimized build, with the same compatibility report as saved builds."""
+    report = summarize(evaluate_parts([(part, 1) for part in build.parts]))
+    return {"score": build.score, "total_price": build.total_price, "parts": build.parts, "compatibility": report}
+
+
+def format_build(build: OptimizedBuild) -> str:
+    """Plain-text rendering used for chat answers and prompt context."""
+    lines = [f"- {canonical_category(p.category)}: {p.name} (₹{p.price:,.0f})" for p in build.parts]
+    lines.append(f"Total: ₹{build.total_price:,.0f}")
+    return "\n".join(lines)
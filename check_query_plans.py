@@ -0,0 +1,100 @@
+"""
+Query-plan assertions for the catalog and builds queries.
+
+Runs every query shape the routers issue through explain() against a local
+mongod (MONGO_URI) after ensure_indexes(), and exits non-zero if any winning
+plan contains a COLLSCAN. In-memory SORT stages are reported as warnings.
+
+    python check_query_plans.py
+"""
+import asyncio
+import os
+import sys
+from itertools import product
+from typing import Any, Dict, List, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import ensure_indexes
+from models.part import PART_SORT_KEYS, PartFilterParams
+from routers.parts import build_parts_query, encode_cursor
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
+
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Flattens a winningPlan tree into its stage names."""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def router_queries(categories: List[str]) -> List[Tuple[str, str, Dict[str, Any], List[Tuple[str, int]]]]:
+    """Every (label, collection, filter, sort) shape issued by the routers."""
+    queries = []
+    for category, sort_key, sort_order, price_range in product(
+        [None] + categories, PART_SORT_KEYS, (1, -1), [(None, None), (10000.0, 50000.0)]
+    ):
+        filters = PartFilterParams(category=category, sort_by=sort_key, sort_order=sort_order,
+                                   min_price=price_range[0], max_price=price_range[1])
+        query, sort = build_parts_query(filters)
+        queries.append((f"GET /parts {filters.model_dump(exclude_none=True)}", "parts", query, sort))
+
+        # The same page continued from a keyset cursor
+        last_doc = {"_id": ObjectId(), sort_key: "M" if sort_key == "name" else 100}
+        filters.cursor = encode_cursor(filters, last_doc)
+        query, sort = build_parts_query(filters)
+        queries.append((f"GET /parts {filters.model_dump(exclude_none=True)}", "parts", query, sort))
+
+    sample_ids = [ObjectId() for _ in range(10)]
+    user_id = ObjectId()
+    queries += [
+        ("part lookup by ids", "parts", {"_id": {"$in": sample_ids}}, []),
+        ("active build", "builds", {"user_id": user_id, "status": "Draft"}, []),
+        ("user builds", "builds", {"user_id": user_id}, []),
+        ("owned build", "builds", {"_id": sample_ids[0], "user_id": user_id}, []),
+        ("user by username", "users", {"username": "demo"}, []),
+    ]
+    return queries
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client.get_database()
+    await ensure_indexes(db)
+
+    categories = await db.parts.distinct("category") or ["CPU"]
+    failures = 0
+    for label, collection, query, sort in router_queries(categories):
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(10).explain()
+        stages = plan_stages(explain["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in stages:
+            failures += 1
+            print(f"FAIL  {label}: {' <- '.join(stages)}")
+        elif "SORT" in stages:
+            print(f"WARN  {label}: in-memory sort ({' <- '.join(stages)})")
+
+    distinct = await db.command("explain", {"distinct": "parts", "key": "category"})
+    if "COLLSCAN" in plan_stages(distinct["queryPlanner"]["winningPlan"]):
+        failures += 1
+        print("FAIL  GET /parts/categories: distinct(category) scans the collection")
+
+    if failures:
+        print(f"{failures} query plan(s) use a collection scan.")
+        sys.exit(1)
+    print("All router queries are index-backed.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+"""
+Declarative compatibility rules for PC builds.
+
+RULES is compiled once at import into a category -> [(other category, predicate)]
+dispatch table, so checking a candidate part against an already-resolved build
+is pure CPU work with no database calls. Both the add-time check and the full
+build report in routers/builds.py are produced by this module.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from math import ceil
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from models.part import PCPart
+
+# A resolved build: (part, quantity) pairs
+BuildParts = List[Tuple[PCPart, int]]
+
+SINGLE_INSTANCE_CATEGORIES = ("CPU", "Motherboard", "GPU", "PSU", "Case")
+POWER_DRAW_CATEGORIES = ("CPU", "GPU")
+PSU_HEADROOM = 1.20  # 20% buffer for peripherals/efficiency losses
+
+# The seeded catalog uses "PowerSupply" where the build rules say "PSU"
+CATEGORY_ALIASES = {"PowerSupply": "PSU"}
+
+
+def canonical_category(category: str) -> str:
+    return CATEGORY_ALIASES.get(category, category)
+
+
+# --- Pairwise predicates: return a message when the pair is incompatible ---
+
+def _socket_mismatch(cpu: PCPart, motherboard: PCPart) -> Optional[str]:
+    if cpu.socket and motherboard.socket and cpu.socket != motherboard.socket:
+        return f"CPU socket ({cpu.socket}) does not match Motherboard socket ({motherboard.socket})."
+    return None
+
+
+def _ram_type_mismatch(ram: PCPart, motherboard: PCPart) -> Optional[str]:
+    if ram.ram_type and motherboard.ram_type and ram.ram_type != motherboard.ram_type:
+        return f"RAM type ({ram.ram_type}) does not match Motherboard requirement ({motherboard.ram_type})."
+    return None
+
+
+def _form_factor_unsupported(motherboard: PCPart, case: PCPart) -> Optional[str]:
+    # Case form_factor is a comma-separated list of supported sizes (e.g. "ATX, Micro-ATX")
+    if motherboard.form_factor and case.form_factor:
+        supported = [ff.strip() for ff in case.form_factor.split(",")]
+        if motherboard.form_factor not in supported:
+            return f"Motherboard form factor ({motherboard.form_factor}) is not supported by selected Case."
+    return None
+
+
+def _gpu_clearance(gpu: PCPart, case: PCPart) -> Optional[str]:
+    if gpu.length_mm and case.max_gpu_length_mm and gpu.length_mm > case.max_gpu_length_mm:
+        return f"GPU length ({gpu.length_mm}mm) exceeds case clearance ({case.max_gpu_length_mm}mm)."
+    return None
+
+
+class PairRule(NamedTuple):
+    first: str
+    second: str
+    severity: str  # severity used in the build report; any violation blocks an add
+    predicate: Callable[[PCPart, PCPart], Optional[str]]
+
+
+RULES: List[PairRule] = [
+    PairRule("CPU", "Motherboard", "error", _socket_mismatch),
+    PairRule("RAM", "Motherboard", "error", _ram_type_mismatch),
+    PairRule("Motherboard", "Case", "error", _form_factor_unsupported),
+    PairRule("GPU", "Case", "warning", _gpu_clearance),
+]
+
+
+def _compile(rules: List[PairRule]) -> Dict[str, List[Tuple[str, str, Callable[[PCPart, PCPart], Optional[str]]]]]:
+    """Builds the category -> [(other category, severity, check(candidate, other))] dispatch."""
+    dispatch = defaultdict(list)
+    for rule in rules:
+        predicate = rule.predicate
+        dispatch[rule.first].append((rule.second, rule.severity, predicate))
+        dispatch[rule.second].append((rule.first, rule.severity, lambda candidate, other, p=predicate: p(other, candidate)))
+    return dict(dispatch)
+
+
+_DISPATCH = _compile(RULES)
+
+
+def _group(build_parts: BuildParts) -> Dict[str, List[PCPart]]:
+    grouped: Dict[str, List[PCPart]] = defaultdict(list)
+    for part, _ in build_parts:
+        grouped[canonical_category(part.category)].append(part)
+    return grouped
+
+
+def required_wattage(build_parts: BuildParts) -> int:
+    """Total TDP of power-consuming parts (times quantity) plus headroom."""
+    total_draw = sum(part.tdp * quantity for part, quantity in build_parts if part.tdp and canonical_category(part.category) != "PSU")
+    return ceil(total_draw * PSU_HEADROOM)
+
+
+def _psu_issue(psu: PCPart, build_parts: BuildParts) -> Optional[str]:
+    required = required_wattage(build_parts)
+    if psu.wattage and psu.wattage < required:
+        return f"PSU wattage ({psu.wattage}W) is below recommended {required}W for current parts."
+    return None
+
+
+def issue(severity: str, message: str) -> Dict[str, str]:
+    return {"type": severity, "message": message}
+
+
+def check_part(candidate: PCPart, build_parts: BuildParts, quantity: int = 1,
+               grouped: Optional[Dict[str, List[PCPart]]] = None) -> List[Dict[str, str]]:
+    """
+    Returns every issue that adding `candidate` to the resolved build would introduce.
+    `grouped` may carry the build already grouped by category when checking many candidates.
+    """
+    category = canonical_category(candidate.category)
+    if grouped is None:
+        grouped = _group(build_parts)
+    issues: List[Dict[str, str]] = []
+
+    if category in SINGLE_INSTANCE_CATEGORIES and grouped.get(category):
+        issues.append(issue("error", f"A {candidate.category} is already present in the build. Only one is allowed."))
+
+    for other_category, severity, check in _DISPATCH.get(category, ()):
+        others = grouped.get(other_category)
+        if others:
+            message = check(candidate, others[0])
+            if message:
+                issues.append(issue(severity, message))
+
+    if category == "PSU" or category in POWER_DRAW_CATEGORIES:
+        psu = candidate if category == "PSU" else next(iter(grouped.get("PSU", ())), None)
+        if psu is not None:
+            message = _psu_issue(psu, build_parts + [(candidate, quantity)])
+            if message:
+                issues.append(issue("error", message))
+
+    return issues
+
+
+def evaluate_parts(build_parts: BuildParts) -> List[Dict[str, str]]:
+    """Runs every rule across an already-resolved build."""
+    grouped = _group(build_parts)
+    issues: List[Dict[str, str]] = []
+
+    for category in SINGLE_INSTANCE_CATEGORIES:
+        if len(grouped.get(category, ())) > 1:
+            issues.append(issue("error", f"Multiple {category} components detected. Only one is allowed."))
+
+    for rule in RULES:
+        firsts, seconds = grouped.get(rule.first), grouped.get(rule.second)
+        if firsts and seconds:
+            message = rule.predicate(firsts[0], seconds[0])
+            if message:
+                issues.append(issue(rule.severity, message))
+
+    psu = next(iter(grouped.get("PSU", ())), None)
+    if psu is not None:
+        message = _psu_issue(psu, build_parts)
+        if message:
+            issues.append(issue("error", message))
+
+    return issues
+
+
+def summarize(issues: List[Dict[str, str]]) -> Dict[str, object]:
+    """Collapses a list of issues into the {status, issues} report shape."""
+    status = "success"
+    if any(i["type"] == "error" for i in issues):
+        status = "error"
+    elif any(i["type"] == "warning" for i in issues):
+        status = "warning"
+    return {"status": status, "issues": issues}
+
+
+# --- Precomputed index for "which parts fit this build" queries ---
+
+class CompatibilityIndex:
+    """
+    Lookup tables over a catalog snapshot:
+    - socket -> CPUs / Motherboards, ram_type -> RAM / Motherboards,
+    - form factor -> Cases, Motherboard-supported form factor sets,
+    - GPUs sorted by length, Cases by GPU clearance, PSUs by wattage.
+    Parts that don't declare an attribute are always kept as candidates, matching
+    the "both sides known" semantics of the rules. The index only narrows the
+    candidate set; check_part still confirms each survivor.
+    """
+
+    def __init__(self, parts: List[PCPart], source=None):
+        self.source = source
+        self.by_category: Dict[str, List[PCPart]] = defaultdict(list)
+        for part in sorted(parts, key=lambda p: p.price):
+            self.by_category[canonical_category(part.category)].append(part)
+
+        self._by_socket = self._keyed(("CPU", "Motherboard"), lambda p: p.socket)
+        self._by_ram_type = self._keyed(("RAM", "Motherboard"), lambda p: p.ram_type)
+        self._by_form_factor = self._keyed(("Motherboard",), lambda p: p.form_factor)
+        self._cases_by_form_factor: Dict[Optional[str], set] = defaultdict(set)
+        for case in self.by_category.get("Case", ()):
+            supported = [ff.strip() for ff in case.form_factor.split(",")] if case.form_factor else [None]
+            for ff in supported:
+                self._cases_by_form_factor[ff].add(case.id)
+
+        self._gpu_lengths = self._sorted("GPU", lambda p: p.length_mm)
+        self._case_clearances = self._sorted("Case", lambda p: p.max_gpu_length_mm)
+        self._psu_wattages = self._sorted("PSU", lambda p: p.wattage)
+
+    def _keyed(self, categories, key) -> Dict[Tuple[str, Optional[str]], set]:
+        table: Dict[Tuple[str, Optional[str]], set] = defaultdict(set)
+        for category in categories:
+            for part in self.by_category.get(category, ()):
+                table[(category, key(part) or None)].add(part.id)
+        return table
+
+    def _sorted(self, category, key) -> Tuple[List[float], List, set]:
+        """(sorted values, ids in the same order, ids with no value)."""
+        known = sorted((key(p), p.id) for p in self.by_category.get(category, ()) if key(p))
+        unknown = {p.id for p in self.by_category.get(category, ()) if not key(p)}
+        return [value for value, _ in known], [part_id for _, part_id in known], unknown
+
+    def _matching(self, table, category, value) -> set:
+        return table.get((category, value), set()) | table.get((category, None), set())
+
+    def candidates(self, category: str, build_parts: BuildParts) -> List[PCPart]:
+        """Parts of `category` that pass every rule against the resolved build, cheapest first."""
+        category = canonical_category(category)
+        grouped = _group(build_parts)
+        if category in SINGLE_INSTANCE_CATEGORIES and grouped.get(category):
+            return []
+
+        first = {cat: parts[0] for cat, parts in grouped.items()}
+        allowed: Optional[set] = None
+
+        def narrow(ids: set):
+            nonlocal allowed
+            allowed = ids if allowed is None else allowed & ids
+
+        cpu, motherboard, case = first.get("CPU"), first.get("Motherboard"), first.get("Case")
+        if category == "CPU" and motherboard and motherboard.socket:
+            narrow(self._matching(self._by_socket, "CPU", motherboard.socket))
+        if category == "Motherboard":
+            if cpu and cpu.socket:
+                narrow(self._matching(self._by_socket, "Motherboard", cpu.socket))
+            ram = first.get("RAM")
+            if ram and ram.ram_type:
+                narrow(self._matching(self._by_ram_type, "Motherboard", ram.ram_type))
+            if case and case.form_factor:
+                supported = set()
+                for ff in case.form_factor.split(","):
+                    supported |= self._matching(self._by_form_factor, "Motherboard", ff.strip())
+                narrow(supported | self._by_form_factor.get(("Motherboard", None), set()))
+        if category == "RAM" and motherboard and motherboard.ram_type:
+            narrow(self._matching(self._by_ram_type, "RAM", motherboard.ram_type))
+        if category == "Case":
+            if motherboard and motherboard.form_factor:
+                narrow(self._cases_by_form_factor.get(motherboard.form_factor, set()) | self._cases_by_form_factor.get(None, set()))
+            gpu = first.get("GPU")
+            if gpu and gpu.length_mm:
+                values, ids, unknown = self._case_clearances
+                narrow(set(ids[bisect_left(values, gpu.length_mm):]) | unknown)
+        if category == "GPU" and case and case.max_gpu_length_mm:
+            values, ids, unknown = self._gpu_lengths
+            narrow(set(ids[:bisect_right(values, case.max_gpu_length_mm)]) | unknown)
+        if category == "PSU":
+            values, ids, unknown = self._psu_wattages
+            narrow(set(ids[bisect_left(values, required_wattage(build_parts)):]) | unknown)
+
+        parts = self.by_category.get(category, [])
+        if allowed is not None:
+            parts = [p for p in parts if p.id in allowed]
+        return [p for p in parts if not check_part(p, build_parts, grouped=grouped)]
@@ -1,75 +1,312 @@
+"""
+Builds and incrementally updates the Chroma vector store used by the RAG chain.
+
+Every part gets a stable vector id derived from (category, name) and a hash of
+the document that would be embedded for it. On each run the script compares
+those hashes with what the store already holds and:
+- embeds and upserts only new or changed parts, in batches,
+- deletes vectors for parts that are no longer in the catalog (including the
+  random-id duplicates older full rebuilds left behind),
+- leaves everything else untouched, so changing one price re-embeds one part.
+
+The catalog comes from a JSON file or straight from the MongoDB `parts`
+collection:
+
+    python create_local_db.py [path/to/database.json | mongo] [--full] [--workers=N]
+
+--full rewrites every part (e.g. after switching embedding models); texts
+already in the embedding cache (rag/embedding_cache.py) are not re-encoded.
+
+Large feeds (hundreds of thousands of SKUs) are embedded in batches of
+EMBED_BATCH_SIZE across a process pool with one MiniLM copy per worker
+(--workers / EMBED_WORKERS, default one per core), and written to Chroma in
+chunks of CHROMA_WRITE_CHUNK. The run reports docs/sec and peak RSS.
+"""
+import asyncio
+import hashlib
 import json
-import re
-from typing import List, Dict, Any
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_core.documents import Document
-
-# --- 1. Load the Data (Your JSON Input) ---
-# Load the JSON data from database.json
-with open('../project_A/database.json', 'r') as f:
-    pc_parts_data = json.load(f)
-
-# --- 2. Define the Parsing Logic (Same as before) ---
-
-def parse_specs_and_create_documents(data: List[Dict[str, Any]]) -> List[Document]:
-    """Parses structured data and creates LangChain Document objects."""
-    documents = []
-
-    def extract_spec(pattern, text):
-        match = re.search(pattern, text, re.IGNORECASE)
-        return match.group(1).strip() if match else None
-
-    for item in data:
-        metadata = {
-            "category": item["category"],
-            "name": item["name"],
-            "price": item["price"].replace("₹", "").replace(",", ""),
-            # Extracting critical compatibility specs
-            "socket": extract_spec(r'(AM5|AM4|LGA1700)', item["specs"]),
-            "memory_type": extract_spec(r'(DDR4|DDR5)', item["specs"]),
-            "wattage": extract_spec(r'(\d+W)', item["specs"] + item["category"]),
-        }
-
-        # This is the text the model will read for context
-        content = (
-            f"PC Part: {item['name']}. Category: {item['category']}. "
-            f"Price: {item['price']}. Detailed Specs: {item['specs']}. "
-            f"COMPATIBILITY HINT: This is a {metadata.get('socket', 'N/A')} socket part and uses {metadata.get('memory_type', 'N/A')} RAM."
-        )
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+from spec_parser import parse_price, parse_specs
+
+load_dotenv()
+
+CATALOG_PATH = os.getenv("CATALOG_PATH", "database.json")
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
+# Texts per encoder call; larger batches amortize tokenization and matmul overhead on CPU
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# Embedding processes; 0 = one per CPU core (each pinned to cores // workers torch threads)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "0"))
+# Vectors per Chroma upsert; kept under Chroma's max batch size (~5461)
+CHROMA_WRITE_CHUNK = int(os.getenv("CHROMA_WRITE_CHUNK", "4000"))
+
+# Bump when the document text or metadata layout changes so every part is re-embedded
+DOCUMENT_VERSION = 1
+
+
+class IndexPlan(NamedTuple):
+    upserts: List[str]  # ids to (re-)embed
+    deletes: List[str]  # ids to remove from the store
+    unchanged: int
+
+
+# --- Source ---
+
+def load_json_items(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def load_mongo_items() -> List[Dict[str, Any]]:
+    """The raw catalog fields of every part in MongoDB (as written by ingest_parts.py)."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        cursor = client.get_database().parts.find({}, projection={"_id": 0, "category": 1, "name": 1, "price": 1, "specs": 1})
+        return [doc async for doc in cursor]
+    finally:
+        client.close()
+
+
+# --- Documents ---
+
+def part_id(item: Dict[str, Any]) -> str:
+    """Stable vector id for a part: the same (category, name) always maps to the same id."""
+    key = f"{item['category']}\x00{item['name']}"
+    return "part-" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def part_document(item: Dict[str, Any]) -> Dict[str, Any]:
+    """The text and metadata embedded for one part; metadata carries the document hash."""
+    specs = parse_specs(item["category"], item.get("specs", ""))
+    metadata = {
+        "category": item["category"],
+        "name": item["name"],
+        "price": parse_price(item.get("price")),
+        "specs": item.get("specs"),  # rendered into the compact prompt cards (rag/context.py)
+        # Critical compatibility specs
+        "socket": specs.get("socket"),
+        "memory_type": specs.get("ram_type"),
+        "wattage": specs.get("wattage"),
+        "tdp": specs.get("tdp"),
+    }
+    metadata = {k: v for k, v in metadata.items() if v is not None}
+
+    price = metadata.get("price")
+    # This is the text the model will read for context
+    content = (
+        f"PC Part: {item['name']}. Category: {item['category']}. "
+        f"Price: {'₹{:,.0f}'.format(price) if price is not None else 'N/A'}. Detailed Specs: {item.get('specs', '')}. "
+        f"COMPATIBILITY HINT: This is a {metadata.get('socket', 'N/A')} socket part and uses {metadata.get('memory_type', 'N/A')} RAM."
+    )
+
+    payload = json.dumps([DOCUMENT_VERSION, content, metadata], sort_keys=True, ensure_ascii=False)
+    metadata["content_hash"] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return {"content": content, "metadata": metadata}
+
+
+def build_documents(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Documents keyed by part id; a later duplicate of the same part wins."""
+    return {part_id(item): part_document(item) for item in items}
+
+
+def plan_index(documents: Dict[str, Dict[str, Any]], stored: Dict[str, str], full: bool = False) -> IndexPlan:
+    """Compares wanted documents with the stored {id: content_hash} and decides what to write."""
+    upserts = [
+        doc_id for doc_id, doc in documents.items()
+        if full or stored.get(doc_id) != doc["metadata"]["content_hash"]
+    ]
+    deletes = [doc_id for doc_id in stored if doc_id not in documents]
+    return IndexPlan(upserts, deletes, len(documents) - len(upserts))
+
+
+# --- Vector store ---
+
+def stored_hashes(vectorstore) -> Dict[str, str]:
+    """{id: content_hash} for every vector in the store ('' for vectors indexed without one)."""
+    stored = vectorstore.get(include=["metadatas"])
+    return {
+        doc_id: (metadata or {}).get("content_hash", "")
+        for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+    }
 
-        documents.append(
-            Document(
-                page_content=content,
-                metadata={k: v for k, v in metadata.items() if v is not None}
-            )
+
+# --- Embedding ---
+
+_worker_embeddings = None
+
+
+def _init_worker(threads: int, batch_size: int):
+    """Loads one copy of the model per worker process, pinned to its share of the cores."""
+    global _worker_embeddings
+    import torch
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from rag.chain import EMBEDDING_MODEL
+
+    torch.set_num_threads(threads)
+    _worker_embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+
+def _embed_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+def resolve_workers(requested: int, batches: int) -> int:
+    """EMBED_WORKERS=0 means one per CPU core; never more workers than batches."""
+    cores = os.cpu_count() or 1
+    return max(1, min(requested or cores, cores, batches))
+
+
+def embed_batches(texts: List[str], embeddings, workers: int, batch_size: int) -> Iterator[List[List[float]]]:
+    """Vectors for `texts`, one list per batch in order, from a process pool when workers > 1."""
+    batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+    if workers <= 1:
+        for batch in batches:
+            yield embeddings.embed_documents(batch)
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    ctx = multiprocessing.get_context("spawn")  # torch is not fork-safe once initialized
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(threads, batch_size)) as pool:
+        yield from pool.map(_embed_in_worker, batches)
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident memory of this process and of the largest finished worker, in MB."""
+    to_mb = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)  # ru_maxrss is KB on Linux, bytes on macOS
+    return {
+        "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * to_mb, 1),
+        "worker": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * to_mb, 1),
+    }
+
+
+# --- Writing ---
+
+def apply_plan(
+    vectorstore,
+    documents: Dict[str, Dict[str, Any]],
+    plan: IndexPlan,
+    embeddings=None,
+    workers: int = 1,
+    cached: Optional[Dict[str, List[float]]] = None,
+    cache=None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    write_chunk: int = CHROMA_WRITE_CHUNK,
+) -> Dict[str, float]:
+    """
+    Deletes removed parts, then writes the upserts in chunks of `write_chunk`.
+    Texts found in `cached` (from the embedding cache) are reused; the rest are
+    embedded and added to `cache`.
+    """
+    collection = vectorstore._collection
+    for start in range(0, len(plan.deletes), write_chunk):
+        collection.delete(ids=plan.deletes[start:start + write_chunk])
+
+    started = time.perf_counter()
+    cached = dict(cached or {})
+    texts = [documents[doc_id]["content"] for doc_id in plan.upserts]
+    missing = list(dict.fromkeys(text for text in texts if text not in cached))
+    fresh = (vector for vectors in embed_batches(missing, embeddings, workers, batch_size) for vector in vectors)
+    pending: List[List[float]] = []
+    computed: Dict[str, List[float]] = {}
+    written = 0
+
+    def flush():
+        nonlocal pending, computed, written
+        ids = plan.upserts[written:written + len(pending)]
+        # Upsert by id, so a changed part replaces its old vector
+        collection.upsert(
+            ids=ids,
+            embeddings=pending,
+            documents=[documents[doc_id]["content"] for doc_id in ids],
+            metadatas=[documents[doc_id]["metadata"] for doc_id in ids],
         )
-    return documents
-
-# --- 3. Setup Embedding Model and Vector Store (The FREE part) ---
-
-print("Initializing local Hugging Face Embedding model...")
-# Downloads the 'all-MiniLM-L6-v2' model the first time this script is run.
-embeddings = HuggingFaceEmbeddings(
-    model_name="all-MiniLM-L6-v2",
-    # Setting model_kwargs to run on CPU is usually the best default for free models
-    model_kwargs={'device': 'cpu'}
-)
-
-CHROMA_DB_PATH = "./pc_parts_vector_db_free"
-
-# --- 4. Execution ---
-print("Starting data parsing and document creation...")
-documents = parse_specs_and_create_documents(pc_parts_data)
-print(f"Created {len(documents)} documents.")
-
-print("Generating embeddings and building ChromaDB...")
-vectorstore = Chroma.from_documents(
-    documents=documents,
-    embedding=embeddings,
-    persist_directory=CHROMA_DB_PATH
-)
-
-vectorstore.persist()
-print(f"Vector Database successfully created and saved at: {CHROMA_DB_PATH}")
-print("Embedding process complete!")
+        if cache is not None:
+            cache.put_many(computed)
+        written += len(pending)
+        pending, computed = [], {}
+        elapsed = time.perf_counter() - started
+        print(f"  indexed {written}/{len(texts)} ({written / elapsed:.0f} docs/sec)")
+
+    for text in texts:
+        if text not in cached:
+            cached[text] = computed[text] = next(fresh)
+        pending.append(cached[text])
+        if len(pending) >= write_chunk:
+            flush()
+    if pending:
+        flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        "written": written,
+        "embedded": len(missing),
+        "seconds": round(seconds, 2),
+        "docs_per_sec": round(written / seconds, 1) if seconds else 0.0,
+    }
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    full = "full" in options
+    source = args[0] if args else CATALOG_PATH
+
+    if source == "mongo":
+        items = asyncio.run(load_mongo_items())
+    else:
+        items = load_json_items(source)
+    documents = build_documents(items)
+    print(f"Loaded {len(items)} parts ({len(documents)} unique) from {source}.")
+
+    from rag.chain import CHROMA_DB_PATH, EMBEDDING_MODEL, load_embeddings, load_vectorstore
+    from rag.embedding_cache import open_embedding_cache
+
+    # Reading ids/hashes doesn't need the model
+    vectorstore = load_vectorstore(None)
+    plan = plan_index(documents, stored_hashes(vectorstore), full=full)
+    print(f"Index plan: {len(plan.upserts)} to write, {len(plan.deletes)} to delete, {plan.unchanged} unchanged.")
+    if not plan.upserts and not plan.deletes:
+        print("Vector store is already up to date.")
+        return
+
+    # Texts embedded before (by an earlier run or a re-added part) skip the encoder
+    cache = open_embedding_cache(CHROMA_DB_PATH, EMBEDDING_MODEL)
+    cached = cache.get_many([documents[doc_id]["content"] for doc_id in plan.upserts]) if cache else {}
+    to_embed = len({documents[doc_id]["content"] for doc_id in plan.upserts} - set(cached))
+    print(f"Embedding cache: {len(cached)} hits, {to_embed} to embed.")
+
+    workers = resolve_workers(int(options.get("workers") or EMBED_WORKERS), -(-to_embed // EMBED_BATCH_SIZE))
+    embeddings = None
+    if workers <= 1 and to_embed:
+        print("Initializing local Hugging Face Embedding model...")
+        embeddings = load_embeddings(cached=False)
+    if to_embed:
+        print(f"Embedding with {workers} process(es), batch size {EMBED_BATCH_SIZE}, "
+              f"writing {CHROMA_WRITE_CHUNK} vectors per Chroma upsert...")
+
+    stats = apply_plan(vectorstore, documents, plan, embeddings, workers, cached, cache)
+    rss = peak_rss_mb()
+    print(f"Vector Database updated at {CHROMA_DB_PATH}: {stats['written']} parts written "
+          f"({stats['embedded']} embedded) in {stats['seconds']}s ({stats['docs_per_sec']} docs/sec), "
+          f"{len(plan.deletes)} deleted. Peak RSS: {rss['main']} MB main, {rss['worker']} MB largest worker.")
+    if cache is not None:
+        print(f"Embedding cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
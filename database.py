@@ -1,5 +1,6 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 import os
+from models.part import PART_SORT_KEYS
 
 # Load environment variables
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
@@ -21,3 +22,58 @@ async def get_user_collection() -> AsyncIOMotorCollection:
 async def get_builds_collection() -> AsyncIOMotorCollection:
     """Dependency to get the PC builds collection."""
     return db.builds
+
+async def get_chat_sessions_collection() -> AsyncIOMotorCollection:
+    """Dependency to get the chat sessions (assistant chat logs) collection."""
+    return db.chat_sessions
+
+# Parts must store prices as numbers: `price_paise` (int, authoritative) and
+# `price` in rupees. Applied by migrate_prices.py once existing string prices are converted.
+PARTS_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["category", "name", "price", "price_paise"],
+        "properties": {
+            "category": {"bsonType": "string"},
+            "name": {"bsonType": "string"},
+            # Strictly positive, matching PCPart.price (gt=0); MongoDB's $jsonSchema is draft 4,
+            # where exclusiveMinimum is a flag on minimum
+            "price": {"bsonType": ["double", "int", "long", "decimal"], "minimum": 0, "exclusiveMinimum": True},
+            "price_paise": {"bsonType": ["int", "long"], "minimum": 1},
+        },
+    }
+}
+
+# Parts still holding a display-string price or lacking price_paise (what migrate_prices.py converts)
+UNMIGRATED_PARTS = {"$or": [
+    {"price": {"$type": "string"}},
+    {"price_paise": {"$exists": False}},
+]}
+
+async def count_unmigrated_parts(database=db) -> int:
+    return await database.parts.count_documents(UNMIGRATED_PARTS)
+
+async def ensure_parts_validator(database=db):
+    """Rejects writes that store a string (or missing) price in the parts collection."""
+    if "parts" not in await database.list_collection_names():
+        await database.create_collection("parts")
+    await database.command("collMod", "parts", validator=PARTS_VALIDATOR, validationLevel="strict", validationAction="error")
+
+async def ensure_indexes(database=db):
+    """Creates every index the routers rely on. Runs at app startup; create_index is a no-op when present."""
+    await database.users.create_index("username", unique=True)
+    await database.users.create_index("email", unique=True, sparse=True)
+    await database.builds.create_index([("user_id", 1), ("status", 1)])
+    # A user's chat sessions, most recent first
+    await database.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
+
+    # Upsert key used by ingest_parts.py
+    await database.parts.create_index([("category", 1), ("name", 1)], unique=True)
+    # GET /parts: optional category filter, price range and a keyset-paginated sort
+    # on any allowed key with _id as tie-breaker; (category, price, _id) also serves
+    # the category + price range filter.
+    for sort_key in PART_SORT_KEYS:
+        await database.parts.create_index([(sort_key, 1), ("_id", 1)])
+        await database.parts.create_index([("category", 1), (sort_key, 1), ("_id", 1)])
+    # Part catalog cache: updated_at watermark polling when change streams are unavailable
+    await database.parts.create_index("updated_at")
@@ -0,0 +1,74 @@
+"""
+Loads the parts catalog into MongoDB with typed compatibility fields.
+
+Each entry is parsed once by spec_parser and upserted keyed on (category, name).
+Entries whose spec_hash matches what is already stored are skipped, so re-running
+after a feed update only rewrites the parts that actually changed.
+
+    python ingest_parts.py [path/to/database.json]
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from database import ensure_indexes
+from spec_parser import parse_part
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
+CATALOG_PATH = os.getenv("CATALOG_PATH", "database.json")
+BATCH_SIZE = 500
+
+
+async def ingest(db, items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Upserts new/changed parts and returns counts of what was written."""
+    stored = {}
+    async for doc in db.parts.find({}, projection={"category": 1, "name": 1, "spec_hash": 1}):
+        stored[(doc.get("category"), doc.get("name"))] = doc.get("spec_hash")
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    ops = []
+    now = datetime.utcnow()
+    for item in items:
+        doc = parse_part(item)
+        key = (doc["category"], doc["name"])
+        if key in stored and stored[key] == doc["spec_hash"]:
+            counts["unchanged"] += 1
+            continue
+        counts["updated" if key in stored else "inserted"] += 1
+        doc["updated_at"] = now
+        ops.append(UpdateOne(
+            {"category": doc["category"], "name": doc["name"]},
+            {"$set": doc, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        ))
+
+    for start in range(0, len(ops), BATCH_SIZE):
+        await db.parts.bulk_write(ops[start:start + BATCH_SIZE], ordered=False)
+    return counts
+
+
+async def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client.get_database()
+    await ensure_indexes(db)
+
+    counts = await ingest(db, items)
+    print(f"Ingested {len(items)} parts from {path}: {counts['inserted']} inserted, "
+          f"{counts['updated']} updated, {counts['unchanged']} unchanged.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,37 +1,43 @@
 
-from fastapi import FastAPI, Depends
+import asyncio
+import time
+PROCESS_STARTED = time.perf_counter()
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, Annotated
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Annotated, List, Optional, Tuple
 from dotenv import load_dotenv
+load_dotenv()  # Load environment variables (before modules that read them at import)
 from auth_utils import get_current_user
-load_dotenv()  # Load environment variables
-
-# LangChain components for RAG
-
-
-from langchain_community.llms import Ollama
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-
-# --- Configuration ---
-CHROMA_DB_PATH = "./pc_parts_vector_db_free"
-
-OLLAMA_MODEL = "phi3:mini"  # Using the available model instead of llama3
+from database import count_unmigrated_parts, db, ensure_indexes, ensure_parts_validator
+from part_catalog import part_catalog
+from rag.answer_cache import normalize_question
+from rag.context import prompt_stats
+from rag.concurrency import GenerationQueueFull, llm_limiter
+from rag.llm import LLM_BACKEND, LLMUnavailable
+from rag.single_flight import Subscription, rag_flights
+from rag.runtime import RAG_RETRY_AFTER_SECONDS, rag_runtime
+from rag.sessions import (
+    create_session, get_session, has_history, is_refinement, merge_facts, record_turn, retrieval_query,
+    session_history, stored_parts,
+)
+from rag.streaming import SSE_HEADERS, sse_event, stream_answer, with_completion
+from rag.tools import direct_build_answer
 
 # --- API Data Models (Pydantic) ---
 
 class QueryRequest(BaseModel):
     """Defines the structure of the incoming user request."""
     question: str
+    session_id: Optional[str] = Field(None, description="Chat session to continue; a new one is started when omitted.")
 
 class QueryResponse(BaseModel):
     """Defines the structure of the outgoing API response."""
     answer: str
     source_db: str = "ChromaDB (Local)"
+    session_id: Optional[str] = None
 
 
 # --- FastAPI Application & State Initialization ---
@@ -49,71 +55,170 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Session-Id", "Retry-After"],
 )
 
-# Global variable to hold the initialized RAG chain (loaded once)
-RAG_CHAIN = None
-
-def initialize_rag_chain():
-    """Initializes and returns the complete RAG chain."""
-    print("➡️ Initializing RAG components...")
-
-    # 1. Load the FREE Embedding Model (Same as used for creation)
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2",
-        model_kwargs={'device': 'cpu'}
-    )
-
-    # 2. Load the Vector Database
-    vectorstore = Chroma(
-        persist_directory=CHROMA_DB_PATH,
-        embedding_function=embeddings
-    )
-    # Retriever finds the top 4 most relevant documents (parts)
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-    print(f"✅ ChromaDB loaded from {CHROMA_DB_PATH}")
-
-    # 3. Load the FREE Local LLM (Ollama)
-    llm = Ollama(model=OLLAMA_MODEL)
-    print(f"✅ Ollama LLM ({OLLAMA_MODEL}) connected")
-
-    # 4. Define the System Prompt
-    prompt_template = """
-    You are an expert PC builder AI. Your task is to recommend a **complete and fully compatible** PC build based ONLY on the parts provided in the context below.
-    You MUST adhere to the following rules:
-    1.  **Compatibility:** Ensure the CPU socket (AM5, LGA1700, AM4), Motherboard socket, and RAM type (DDR4 or DDR5) **match**.
-    2.  **Budget:** Adhere strictly to the user's requested budget.
-    3.  **Output:** List the recommended parts, their prices, and the total cost. State explicitly if the build is compatible.
-
-    CONTEXT:
-    {context}
-
-    USER REQUEST: {question}
-
-    RECOMMENDATION:
-    """
-    RAG_PROMPT = PromptTemplate(template=prompt_template, input_variables=["context", "question"])
+# Background index creation and the price-migration precondition, reported by /ready
+INDEX_STATE = {"state": "pending", "error": None}
+PRICE_STATE = {"state": "pending", "unmigrated": None, "validator": False, "error": None}
 
-    # 5. Create the RAG Chain using LCEL
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
 
-    qa_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | RAG_PROMPT
-        | llm
-        | StrOutputParser()
-    )
-    print("✅ RAG Chain created successfully!")
-    return qa_chain
+async def ensure_indexes_in_background():
+    INDEX_STATE["state"] = "loading"
+    try:
+        await ensure_indexes()
+        INDEX_STATE["state"] = "ready"
+    except Exception as e:
+        INDEX_STATE.update(state="failed", error=str(e))
+        print(f"⚠️ Could not ensure MongoDB indexes: {e}")
+
+
+async def ensure_price_migration():
+    """
+    Prices are read as integer paise everywhere (checkout, build optimizer), so
+    migrate_prices.py is a precondition: refuse loudly while unmigrated parts
+    remain, otherwise install the validator that keeps it that way.
+    """
+    PRICE_STATE["state"] = "loading"
+    try:
+        unmigrated = await count_unmigrated_parts(db)
+    except Exception as e:
+        PRICE_STATE.update(state="failed", error=str(e))
+        print(f"⚠️ Could not check part prices: {e}")
+        return
+    PRICE_STATE["unmigrated"] = unmigrated
+    if unmigrated:
+        PRICE_STATE.update(state="failed", error=f"{unmigrated} parts have unmigrated prices; run python migrate_prices.py")
+        print(f"❌ {unmigrated} parts still have string or missing prices. Run `python migrate_prices.py`; "
+              "checkout and the build optimizer reject them until then.")
+        return
+    try:
+        await ensure_parts_validator(db)
+        PRICE_STATE["validator"] = True
+    except Exception as e:
+        # e.g. no collMod permission; the data is migrated, only future writes are unguarded
+        PRICE_STATE["error"] = str(e)
+        print(f"⚠️ Could not install the parts validator: {e}")
+    PRICE_STATE["state"] = "ready"
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Runs once when the FastAPI server starts."""
-    global RAG_CHAIN
-    RAG_CHAIN = initialize_rag_chain()
-    print("🔥 FastAPI server is ready to handle requests.")
+    """
+    Runs once when the FastAPI server starts. Nothing here blocks: index creation
+    and the RAG stack load in the background while catalog routes already serve.
+    """
+    asyncio.create_task(ensure_indexes_in_background())
+    asyncio.create_task(ensure_price_migration())
+    # Keep the in-process part cache coherent with the parts collection
+    part_catalog.start(db.parts)
+    rag_runtime.start()
+    print(f"🔥 FastAPI server is ready to handle requests ({time.perf_counter() - PROCESS_STARTED:.2f}s after import).")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stops background tasks started at startup."""
+    await part_catalog.stop()
+    await rag_runtime.stop()
+
+
+def require_rag_ready():
+    """503 until the background RAG initialization has finished."""
+    if rag_runtime.ready:
+        return
+    if rag_runtime.failed:
+        raise HTTPException(status_code=503, detail="RAG initialization failed. Please check server logs.")
+    raise HTTPException(status_code=503, detail="The assistant is still starting up. Please try again shortly.",
+                        headers={"Retry-After": str(RAG_RETRY_AFTER_SECONDS)})
+
+
+async def build_optimizer_answer(question: str) -> Optional[str]:
+    """The optimizer's answer for full-build budget questions; None falls back to the LLM."""
+    try:
+        return await direct_build_answer(question)
+    except Exception as e:
+        print(f"⚠️ Build optimizer failed, falling back to the LLM: {e}")
+        return None
+
+
+async def open_chat_session(session_id: Optional[str], user_id: str) -> Dict[str, Any]:
+    """The user's chat session to continue, or a new one when no id is given."""
+    if session_id is None:
+        return await create_session(db.chat_sessions, user_id)
+    session = await get_session(db.chat_sessions, session_id, user_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found.")
+    return session
+
+
+async def prepare_turn(session: Dict[str, Any], question: str) -> Tuple[Dict[str, Any], Dict[str, Any], List[Any]]:
+    """
+    Chain inputs for a question within its session: the bounded history, the
+    session's requirements, and the parts to ground the answer on (reused from
+    the previous turn when the question refines that build).
+    """
+    facts = merge_facts(session.get("facts", {}), question)
+    if is_refinement(question, session, facts):
+        parts = stored_parts(session)
+    else:
+        parts = await rag_runtime.retriever.ainvoke(retrieval_query(question, facts))
+    history = session_history(session, facts) if has_history(session) else None
+    return {"question": question, "history": history, "parts": parts}, facts, parts
+
+
+async def save_turn(session: Dict[str, Any], question: str, answer: str, facts: Optional[Dict[str, Any]] = None, parts=None):
+    """Stores the exchange in the session; a failed write never costs the user the answer."""
+    try:
+        facts = facts if facts is not None else merge_facts(session.get("facts", {}), question)
+        await record_turn(db.chat_sessions, session, question, answer, facts, parts)
+    except Exception as e:
+        print(f"⚠️ Could not save chat turn for session {session['_id']}: {e}")
+
+
+async def generate_answer(inputs: Dict[str, Any]):
+    """One LLM run of the chain, holding one of the bounded LLM slots."""
+    rag_runtime.model_keeper.touch()
+    async with llm_limiter.slot():
+        async for chunk in rag_runtime.chain.astream(inputs):
+            yield chunk
+
+
+def coalescing_key(session: Dict[str, Any], question: str) -> str:
+    """Identical questions coalesce only under the same session requirements."""
+    facts = merge_facts(session.get("facts", {}), question)
+    return f"{normalize_question(question)}|{sorted(facts.items())}"
+
+
+def join_generation(session: Dict[str, Any], question: str, question_vector) -> Subscription:
+    """
+    Starts (or joins) the shared generation for this question. Identical in-flight
+    questions share one retrieval and one LLM run; the retrieved parts are left in
+    the flight's meta for every subscriber to save with its turn. Only used for
+    questions without chat history, whose answer depends on nothing but the
+    question and the requirements it states.
+    """
+    async def generate(flight):
+        inputs, _, parts = await prepare_turn(session, question)
+        flight.meta["parts"] = parts
+        async for chunk in generate_answer(inputs):
+            yield chunk
+
+    async def remember(answer: str):
+        await asyncio.to_thread(rag_runtime.answer_cache.store, question, answer, question_vector)
+
+    return rag_flights.join(coalescing_key(session, question), generate, on_complete=remember)
+
+
+def check_generation_capacity():
+    """Rejects up front when a new generation couldn't get a slot or the LLM backend is down."""
+    if llm_limiter.is_full():
+        raise HTTPException(status_code=429, detail="The assistant is busy. Please try again shortly.",
+                            headers={"Retry-After": str(llm_limiter.retry_after())})
+    breaker = rag_runtime.llm.breaker
+    if breaker.state == "open":
+        raise HTTPException(status_code=503, detail="The language model is unavailable. Please try again shortly.",
+                            headers={"Retry-After": str(breaker.retry_after())})
 
 
 @app.post("/ask", response_model=QueryResponse)
@@ -122,27 +227,105 @@ async def ask_question(
     current_user: Annotated[Dict[str, Any], Depends(get_current_user)]
 ):
     """API endpoint to receive a user question and return a PC build recommendation."""
+    session = await open_chat_session(request.session_id, current_user["user_id"])
+    session_id = str(session["_id"])
 
-    if RAG_CHAIN is None:
-        return QueryResponse(answer="RAG chain not initialized. Please check server logs.")
+    # Full-build budget questions are solved deterministically, even while the RAG stack loads
+    optimized_answer = await build_optimizer_answer(request.question)
+    if optimized_answer is not None:
+        await save_turn(session, request.question, optimized_answer)
+        return QueryResponse(answer=optimized_answer, source_db="Build optimizer", session_id=session_id)
+
+    require_rag_ready()
 
     try:
         # Now, only authenticated users can run RAG queries
         # You can log the query using current_user["user_id"]
         print(f"RAG query received from User ID: {current_user['user_id']}")
 
-        # Invoke the RAG chain with the user's question
-        result = RAG_CHAIN.invoke(request.question)
+        if has_history(session):
+            # Follow-ups depend on the conversation, so they skip the answer cache and coalescing
+            inputs, facts, parts = await prepare_turn(session, request.question)
+            result = "".join([chunk async for chunk in generate_answer(inputs)])
+        else:
+            # Near-identical questions are answered from the cache without running the LLM
+            # (the encoder is CPU-bound, so it runs off the event loop)
+            cached_answer, question_vector = await asyncio.to_thread(rag_runtime.answer_cache.lookup, request.question)
+            if cached_answer is not None:
+                await save_turn(session, request.question, cached_answer)
+                return QueryResponse(answer=cached_answer, session_id=session_id)
+
+            # Run the RAG chain asynchronously, sharing retrieval and generation with identical in-flight questions
+            subscription = join_generation(session, request.question, question_vector)
+            result = await subscription.result()
+            facts, parts = None, subscription.flight.meta.get("parts")
 
         # The result from LCEL chain is a string
-        return QueryResponse(answer=result)
-
+        await save_turn(session, request.question, result, facts, parts)
+        return QueryResponse(answer=result, session_id=session_id)
+
+    except GenerationQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except LLMUnavailable as e:
+        # Backend down, timed out, or its circuit breaker is open (see rag/llm.py)
+        print(f"LLM unavailable: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error during RAG execution: {e}")
-        # Add a clearer error message for Ollama connection issues
-        if "Failed to connect to Ollama" in str(e):
-            return QueryResponse(answer="Error: Could not connect to the local Ollama LLM. Please ensure 'ollama serve' is running in a separate terminal.")
-        return QueryResponse(answer=f"An unexpected error occurred: {str(e)}")
+        return QueryResponse(answer=f"An unexpected error occurred: {str(e)}", session_id=session_id)
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(
+    request: QueryRequest,
+    http_request: Request,
+    current_user: Annotated[Dict[str, Any], Depends(get_current_user)]
+):
+    """Same as /ask, but streams the answer token by token as Server-Sent Events."""
+    session = await open_chat_session(request.session_id, current_user["user_id"])
+    headers = {**SSE_HEADERS, "X-Session-Id": str(session["_id"])}
+
+    async def complete_answer(answer: str):
+        await save_turn(session, request.question, answer)
+        yield sse_event({"token": answer})
+        yield sse_event({"answer": answer}, event="done")
+
+    optimized_answer = await build_optimizer_answer(request.question)
+    if optimized_answer is not None:
+        return StreamingResponse(complete_answer(optimized_answer), media_type="text/event-stream", headers=headers)
+
+    require_rag_ready()
+
+    print(f"Streamed RAG query received from User ID: {current_user['user_id']}")
+    history = has_history(session)
+    question_vector = None
+    if not history:
+        cached_answer, question_vector = await asyncio.to_thread(rag_runtime.answer_cache.lookup, request.question)
+        if cached_answer is not None:
+            return StreamingResponse(complete_answer(cached_answer), media_type="text/event-stream", headers=headers)
+
+    # Reject before the stream starts when a new generation couldn't get a slot or the LLM is down
+    if history or not rag_flights.in_flight(coalescing_key(session, request.question)):
+        check_generation_capacity()
+
+    background = None
+    if history:
+        inputs, facts, parts = await prepare_turn(session, request.question)
+        chunks = generate_answer(inputs)
+        save = lambda answer: save_turn(session, request.question, answer, facts, parts)
+    else:
+        # Late joiners of an in-flight generation replay the tokens produced so far. The
+        # subscription already counts; the background task releases it even if the
+        # stream never starts (client gone before the response began)
+        subscription = join_generation(session, request.question, question_vector)
+        chunks = subscription.chunks()
+        background = BackgroundTask(subscription.release)
+        save = lambda answer: save_turn(session, request.question, answer, parts=subscription.flight.meta.get("parts"))
+
+    # Saved only when the answer streamed to the end
+    chunks = with_completion(chunks, save)
+    return StreamingResponse(stream_answer(chunks, http_request), media_type="text/event-stream", headers=headers,
+                             background=background)
 
 # --- Root Endpoint (Optional check) ---
 
@@ -150,12 +333,84 @@ async def ask_question(
 def read_root():
     return {"status": "ok", "message": "PC Builder RAG API is running!"}
 
+
+@app.get("/ready")
+async def readiness(response: Response):
+    """
+    Per-component startup state. 200 once MongoDB answers (catalog, build and
+    payment routes can serve); 503 while parts with unmigrated prices remain.
+    The RAG stack may still be loading.
+    """
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=2)
+        mongo = {"state": "ready", "error": None}
+    except Exception as e:
+        mongo = {"state": "failed", "error": str(e) or type(e).__name__}
+    healthy = mongo["state"] == "ready" and PRICE_STATE["state"] != "failed"
+    if not healthy:
+        response.status_code = 503
+    return {
+        "api": "ready" if healthy else "degraded",
+        "components": {
+            "mongodb": mongo,
+            "indexes": INDEX_STATE,
+            "prices": PRICE_STATE,
+            "part_catalog": part_catalog.stats(),
+        },
+        "rag": rag_runtime.status(),
+    }
+
+
+@app.get("/health/llm")
+async def llm_health(response: Response):
+    """
+    LLM backend health: for Ollama, whether the model is loaded in memory (checked
+    live) plus warm-up/heartbeat state; for every backend, the circuit breaker.
+    503 when the model isn't loaded or the breaker is open.
+    """
+    backend = rag_runtime.llm.status() if rag_runtime.llm is not None else {"backend": LLM_BACKEND}
+    status = {**backend, "model_state": None}
+    if LLM_BACKEND == "ollama":
+        status["model_state"] = await rag_runtime.model_keeper.refresh()
+        healthy = status["model_state"]["loaded"]
+    else:
+        healthy = rag_runtime.llm is not None
+    if not healthy or backend.get("circuit_breaker", {}).get("state") == "open":
+        response.status_code = 503
+    return status
+
+
+@app.get("/ask/cache/stats")
+def get_answer_cache_stats():
+    """Hit/miss counters for the semantic answer cache."""
+    return rag_runtime.answer_cache.stats() if rag_runtime.answer_cache is not None else {"entries": 0}
+
+
+@app.get("/ask/embeddings/stats")
+def get_embedding_cache_stats():
+    """Size, hit rate and evictions of the on-disk embedding cache."""
+    cache = getattr(rag_runtime.embeddings, "cache", None)
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/ask/prompt/stats")
+def get_prompt_stats():
+    """Average and last prompt/context token counts sent to the LLM."""
+    return prompt_stats.stats()
+
+
+@app.get("/ask/queue/stats")
+def get_llm_queue_stats():
+    """Running/waiting/rejected generation counts and coalesced requests."""
+    return {**llm_limiter.stats(), "coalescing": rag_flights.stats()}
+
 # --- NEW IMPORTS for modularity ---
 from routers.auth import auth_router
 from routers.parts import parts_router
 from routers.builds import builds_router
 from routers.users import router
 from routers.payment import payment_router
+from routers.chat import chat_router
 
 # --- Register the Routers ---
 
@@ -173,3 +428,6 @@ app.include_router(router, prefix="/api/v1/users")
 
 # Payment routes
 app.include_router(payment_router, prefix="/payment")
+
+# Assistant chat session routes
+app.include_router(chat_router, prefix="/ask")
@@ -0,0 +1,83 @@
+"""
+Cold-start measurement for the API.
+
+Starts `uvicorn main:app` in a subprocess and reports how long after spawning
+each milestone is reached:
+- the first successful GET / (the app is accepting traffic),
+- the first successful GET /api/v1/parts/categories (catalog routes served from MongoDB),
+- GET /ready reporting the RAG stack ready (or failed), with per-component load times.
+Exits non-zero if the catalog route misses the budget (COLD_START_BUDGET_SECONDS).
+
+    python measure_cold_start.py [port]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional, Tuple
+
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "3"))
+RAG_WAIT_SECONDS = float(os.getenv("RAG_WAIT_SECONDS", "180"))
+
+
+def fetch(url: str) -> Tuple[Optional[int], Optional[dict]]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None, None
+
+
+def wait_for(url: str, started: float, deadline: float, done=lambda status, body: status == 200):
+    """Seconds after `started` at which `done(status, body)` first held, or None on timeout."""
+    while time.perf_counter() < deadline:
+        status, body = fetch(url)
+        if done(status, body):
+            return time.perf_counter() - started, body
+        time.sleep(0.05)
+    return None, None
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+    )
+    try:
+        root_seconds, _ = wait_for(f"{base}/", started, started + 60)
+        catalog_seconds, _ = wait_for(f"{base}/api/v1/parts/categories", started, started + 60)
+        rag_seconds, ready = wait_for(
+            f"{base}/ready", started, started + RAG_WAIT_SECONDS,
+            done=lambda status, body: bool(body) and (body["rag"]["ready"] or any(
+                c["state"] == "failed" for c in body["rag"]["components"].values())),
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    def show(seconds):
+        return f"{seconds:.2f}s" if seconds is not None else "timed out"
+
+    print(f"GET /                        {show(root_seconds)}")
+    print(f"GET /api/v1/parts/categories {show(catalog_seconds)}")
+    print(f"RAG stack settled            {show(rag_seconds)}")
+    if ready:
+        for name, component in ready["rag"]["components"].items():
+            detail = f"{component['seconds']}s" if component["seconds"] is not None else component["error"] or ""
+            print(f"  {name:<12} {component['state']:<8} {detail}")
+
+    if catalog_seconds is None or catalog_seconds > COLD_START_BUDGET_SECONDS:
+        print(f"Catalog routes missed the {COLD_START_BUDGET_SECONDS}s cold-start budget.")
+        sys.exit(1)
+    print(f"Catalog routes served within the {COLD_START_BUDGET_SECONDS}s cold-start budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+One-shot migration of part prices from display strings ("₹39,757") to numbers.
+
+Every part gets `price_paise` (int) and a numeric `price` in rupees, written in
+batches. Once no string prices remain, the parts collection validator is
+installed so later writes cannot reintroduce them. Safe to re-run.
+
+    python migrate_prices.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import UNMIGRATED_PARTS, ensure_parts_validator
+from spec_parser import price_fields
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/pc_builder_db")
+BATCH_SIZE = 1000
+
+async def migrate_prices(db, batch_size: int = BATCH_SIZE):
+    """Converts prices in batches; returns (migrated count, ids whose price could not be parsed)."""
+    migrated = 0
+    unparseable = []
+    ops = []
+    now = datetime.utcnow()
+    async for doc in db.parts.find(UNMIGRATED_PARTS, projection={"price": 1}):
+        fields = price_fields(doc.get("price"))
+        if fields["price_paise"] is None:
+            unparseable.append(doc["_id"])
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {**fields, "updated_at": now}}))
+        if len(ops) >= batch_size:
+            await db.parts.bulk_write(ops, ordered=False)
+            migrated += len(ops)
+            ops = []
+    if ops:
+        await db.parts.bulk_write(ops, ordered=False)
+        migrated += len(ops)
+    return migrated, unparseable
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client.get_database()
+
+    migrated, unparseable = await migrate_prices(db)
+    print(f"Migrated {migrated} part prices to integer paise.")
+    if unparseable:
+        print(f"Could not parse the price of {len(unparseable)} parts; fix them and re-run:")
+        for part_id in unparseable:
+            print(f"  {part_id}")
+        sys.exit(1)
+
+    await ensure_parts_validator(db)
+    print("Parts validator installed: string prices are now rejected on write.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
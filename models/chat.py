@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Annotated, Dict, Any
+from datetime import datetime
+from pydantic import BeforeValidator
+from models.user import PyObjectId, validate_object_id  # Reuse the custom ObjectId handler
+
+# One message of the assistant chat log
+class ChatMessage(BaseModel):
+    role: str = Field(..., description="'user' or 'assistant'")
+    content: str
+    at: Optional[datetime] = None
+
+# A session in the user's list (no messages)
+class ChatSessionSummary(BaseModel):
+    id: Annotated[PyObjectId, BeforeValidator(validate_object_id)] = Field(alias="_id")
+    title: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        populate_by_name = True
+        arbitrary_types_allowed = True
+
+# A full session: the chat log plus the condensed memory used for prompts
+class ChatSessionOut(ChatSessionSummary):
+    messages: List[ChatMessage] = Field(default_factory=list)
+    summary: List[str] = Field(default_factory=list, description="Rolling notes on messages folded out of the prompt window.")
+    facts: Dict[str, Any] = Field(default_factory=dict, description="Requirements stated so far (budget, use case, socket, RAM type).")
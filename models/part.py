@@ -1,6 +1,6 @@
 # models/part.py
 from pydantic import BaseModel, Field
-from typing import Optional, Annotated
+from typing import Optional, Annotated, Literal, get_args
 from bson.objectid import ObjectId
 from pydantic import BeforeValidator
 from models.user import PyObjectId, validate_object_id # Reuse the custom ObjectId handler
@@ -35,12 +35,17 @@ class PCPart(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {PyObjectId: str}
 
+# Fields GET /parts may sort on; each one is backed by an index (see database.ensure_indexes)
+PartSortKey = Literal["price", "name", "cores"]
+PART_SORT_KEYS = get_args(PartSortKey)
+
 class PartFilterParams(BaseModel):
     """Model for accepting query parameters for filtering/sorting."""
     category: Optional[str] = None
     min_price: Optional[float] = None
     max_price: Optional[float] = None
-    sort_by: Optional[str] = Field("price", example="price, name, cores")
+    sort_by: Optional[PartSortKey] = Field("price", example="price, name, cores")
     sort_order: Optional[int] = Field(1, example="1 for ascending, -1 for descending")
     limit: Optional[int] = Field(10, gt=0, le=100)
-    skip: Optional[int] = Field(0, ge=0)
\ No newline at end of file
+    cursor: Optional[str] = Field(None, description="Opaque next_cursor from the previous page (X-Next-Cursor header)")
+    skip: Optional[int] = Field(0, ge=0, description="Deprecated: use cursor. Ignored when cursor is set.")
\ No newline at end of file
@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+PART_CACHE_MAX_SIZE = int(os.getenv("PART_CACHE_MAX_SIZE", "10000"))
+PART_CACHE_TTL_SECONDS = float(os.getenv("PART_CACHE_TTL_SECONDS", "300"))
+PART_CACHE_POLL_SECONDS = float(os.getenv("PART_CACHE_POLL_SECONDS", "30"))
+
+
+class PartCatalog:
+    """
+    In-process cache of part documents keyed by ObjectId.
+    - bounded size with LRU eviction and a per-entry TTL,
+    - `version` is bumped on every invalidation so derived caches can key on it,
+    - invalidated from a Mongo change stream, or by polling `updated_at` when
+      change streams are unavailable (standalone mongod); polling also re-checks
+      the cached ids, since deleted parts leave no `updated_at` behind.
+    """
+
+    def __init__(self, max_size: int = PART_CACHE_MAX_SIZE, ttl_seconds: float = PART_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Full-catalog snapshots are counted apart so they don't skew the per-part hit rate
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self._entries: "OrderedDict[ObjectId, tuple]" = OrderedDict()
+        self._snapshot: Optional[tuple] = None  # (version, expires_at, docs)
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # --- Lookups ---
+
+    def _lookup(self, part_id: ObjectId, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(part_id)
+        if entry is None:
+            return None
+        expires_at, doc = entry
+        if expires_at < now:
+            del self._entries[part_id]
+            return None
+        self._entries.move_to_end(part_id)
+        return doc
+
+    def _store(self, doc: Dict[str, Any], now: float):
+        self._entries[doc["_id"]] = (now + self.ttl_seconds, doc)
+        self._entries.move_to_end(doc["_id"])
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_many(self, part_ids: Iterable[ObjectId], parts_collection: AsyncIOMotorCollection) -> Dict[ObjectId, Dict[str, Any]]:
+        """Returns part documents keyed by _id; misses are fetched with one $in query."""
+        now = time.monotonic()
+        found: Dict[ObjectId, Dict[str, Any]] = {}
+        missing: List[ObjectId] = []
+        for part_id in dict.fromkeys(part_ids):
+            doc = self._lookup(part_id, now)
+            if doc is None:
+                missing.append(part_id)
+            else:
+                found[part_id] = doc
+
+        self.hits += len(found)
+        self.misses += len(missing)
+        if not missing:
+            return found
+
+        version_at_fetch = self.version
+        cursor = parts_collection.find({"_id": {"$in": missing}})
+        docs = await cursor.to_list(length=len(missing))
+        now = time.monotonic()
+        for doc in docs:
+            found[doc["_id"]] = doc
+            # Don't cache a document that may have been invalidated while we were fetching it
+            if self.version == version_at_fetch:
+                self._store(doc, now)
+        return found
+
+    async def get(self, part_id: ObjectId, parts_collection: AsyncIOMotorCollection) -> Optional[Dict[str, Any]]:
+        """Returns a single part document, or None if it is not in the catalog."""
+        docs = await self.get_many([part_id], parts_collection)
+        return docs.get(part_id)
+
+    async def snapshot(self, parts_collection: AsyncIOMotorCollection) -> List[Dict[str, Any]]:
+        """
+        Returns every part document in the catalog. The list is shared until the
+        catalog version changes or the TTL lapses, so callers can key derived
+        structures on its identity.
+        """
+        now = time.monotonic()
+        if self._snapshot is not None:
+            version, expires_at, docs = self._snapshot
+            if version == self.version and expires_at >= now:
+                self.snapshot_hits += 1
+                return docs
+
+        self.snapshot_misses += 1
+        version_at_fetch = self.version
+        docs = await parts_collection.find({}).to_list(length=None)
+        if self.version == version_at_fetch:
+            self._snapshot = (version_at_fetch, now + self.ttl_seconds, docs)
+        return docs
+
+    # --- Invalidation ---
+
+    def invalidate(self, part_ids: Optional[Iterable[ObjectId]] = None):
+        """Drops the given ids (or everything) and bumps the catalog version."""
+        if part_ids is None:
+            self._entries.clear()
+        else:
+            for part_id in part_ids:
+                self._entries.pop(part_id, None)
+        self._snapshot = None
+        self.version += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "snapshot_hits": self.snapshot_hits,
+            "snapshot_misses": self.snapshot_misses,
+        }
+
+    async def _watch_change_stream(self, parts_collection: AsyncIOMotorCollection):
+        async with parts_collection.watch() as stream:
+            logger.info("Part catalog cache: watching change stream")
+            async for change in stream:
+                if change.get("operationType") in ("drop", "rename", "dropDatabase", "invalidate"):
+                    self.invalidate()
+                else:
+                    self.invalidate([change["documentKey"]["_id"]])
+
+    async def _poll_updated_at(self, parts_collection: AsyncIOMotorCollection, interval: float):
+        logger.info("Part catalog cache: change streams unavailable, polling updated_at every %ss", interval)
+        latest = await parts_collection.find_one({"updated_at": {"$exists": True}}, sort=[("updated_at", -1)], projection={"updated_at": 1})
+        watermark = latest["updated_at"] if latest else None
+        while True:
+            await asyncio.sleep(interval)
+            query = {"updated_at": {"$gt": watermark}} if watermark else {"updated_at": {"$exists": True}}
+            changed = await parts_collection.find(query, projection={"updated_at": 1}).to_list(length=None)
+            if changed:
+                self.invalidate([doc["_id"] for doc in changed])
+                watermark = max(doc["updated_at"] for doc in changed)
+            await self._drop_deleted(parts_collection)
+
+    async def _drop_deleted(self, parts_collection: AsyncIOMotorCollection):
+        """Invalidates cached parts that no longer exist, and the snapshot if the catalog shrank."""
+        cached_ids = list(self._entries)
+        if cached_ids:
+            present = await parts_collection.find({"_id": {"$in": cached_ids}}, projection={"_id": 1}).to_list(length=None)
+            deleted = set(cached_ids) - {doc["_id"] for doc in present}
+            if deleted:
+                self.invalidate(deleted)
+        if self._snapshot is not None:
+            # Inserts and edits carry a fresh updated_at, so a count mismatch means a delete
+            if await parts_collection.count_documents({}) != len(self._snapshot[2]):
+                self.invalidate([])  # per-part entries were re-checked above
+
+    async def watch(self, parts_collection: AsyncIOMotorCollection, poll_interval: float = PART_CACHE_POLL_SECONDS):
+        """Keeps the cache coherent with the parts collection until cancelled."""
+        while True:
+            try:
+                await self._watch_change_stream(parts_collection)
+            except OperationFailure:
+                # Change streams need a replica set; fall back to the updated_at watermark
+                break
+            except PyMongoError as e:
+                logger.warning(f"Part catalog change stream interrupted ({e}); retrying in {poll_interval}s")
+                await asyncio.sleep(poll_interval)
+            # Changes may have been missed while the stream was closed
+            self.invalidate()
+        self.invalidate()
+        await self._poll_updated_at(parts_collection, poll_interval)
+
+    def start(self, parts_collection: AsyncIOMotorCollection):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self.watch(parts_collection))
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except (asyncio.CancelledError, PyMongoError):
+                pass
+            self._watch_task = None
+
+
+# Shared instance used by all routers
+part_catalog = PartCatalog()
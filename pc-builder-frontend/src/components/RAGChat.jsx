@@ -1,7 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { useBuild } from '../context/BuildContext';
 import { useAuth } from '../context/AuthContext';
-import apiClient from '../api/apiClient';
 import { PaperAirplaneIcon, XMarkIcon, ArrowsPointingOutIcon, ArrowsPointingInIcon } from '@heroicons/react/24/solid';
 
 const RAGChat = ({ isOpen, onClose }) => {
@@ -14,6 +13,9 @@ const RAGChat = ({ isOpen, onClose }) => {
     const { isAuthenticated } = useAuth();
     const messagesEndRef = useRef(null);
     const inputRef = useRef(null);
+    const abortRef = useRef(null);
+    // Server-side chat session, so follow-ups like "make it cheaper" keep their context
+    const sessionIdRef = useRef(null);
 
     useEffect(() => {
         scrollToBottom();
@@ -37,27 +39,95 @@ const RAGChat = ({ isOpen, onClose }) => {
         setInput('');
         setIsLoading(true);
 
+        const controller = new AbortController();
+        abortRef.current = controller;
         try {
             setIsTyping(true);
             const buildContext = currentBuild ? `Current build has ${currentBuild.components?.length || 0} parts.` : 'No build yet.';
-            const response = await apiClient.post(
-                '/ask',
-                { question: `${input}\n\nBuild context: ${buildContext}` },
-                { baseURL: 'http://127.0.0.1:8000' }
-            );
+            // Streamed as Server-Sent Events; fetch is used because EventSource can't POST
+            const token = localStorage.getItem('accessToken');
+            const response = await fetch('http://127.0.0.1:8000/ask/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    ...(token ? { Authorization: `Bearer ${token}` } : {}),
+                },
+                body: JSON.stringify({ question: `${input}\n\nBuild context: ${buildContext}`, session_id: sessionIdRef.current }),
+                signal: controller.signal,
+            });
+            if (response.status === 401) {
+                // Same as the apiClient interceptor: clear the invalid token and redirect to login
+                localStorage.removeItem('accessToken');
+                window.location.href = '/login';
+                console.error("Authentication failed or token expired.");
+                setIsTyping(false);
+                return;
+            }
+            sessionIdRef.current = response.headers.get('X-Session-Id') || sessionIdRef.current;
+            if (response.status === 404 && sessionIdRef.current) {
+                // The session was deleted elsewhere; the next message starts a new one
+                sessionIdRef.current = null;
+            }
+            if (response.status === 503 || response.status === 429) {
+                const retryAfter = response.headers.get('Retry-After');
+                const message = response.status === 503
+                    ? 'The assistant is still starting up.'
+                    : 'The assistant is busy right now.';
+                setMessages(prev => [...prev, { role: 'assistant', content: `${message} Please try again${retryAfter ? ` in ${retryAfter} seconds` : ' shortly'}.` }]);
+                setIsTyping(false);
+                return;
+            }
+            if (!response.ok) throw new Error(`Request failed with status ${response.status}`);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let started = false;
+            const appendToken = (token) => {
+                if (!started) {
+                    started = true;
+                    setIsTyping(false);
+                    setMessages(prev => [...prev, { role: 'assistant', content: token }]);
+                    return;
+                }
+                setMessages(prev => {
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+                });
+            };
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                for (const raw of events) {
+                    const event = raw.match(/^event: (.*)$/m)?.[1] || 'message';
+                    const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}');
+                    if (event === 'message') appendToken(data.token);
+                    if (event === 'error') throw new Error(data.message);
+                }
+            }
             setIsTyping(false);
-            const aiMessage = { role: 'assistant', content: response.data.answer };
-            setMessages(prev => [...prev, aiMessage]);
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error('Error sending message:', error);
             setIsTyping(false);
             const errorMessage = { role: 'assistant', content: 'Sorry, I encountered an error. Please ensure the backend and Ollama are running and try again.' };
             setMessages(prev => [...prev, errorMessage]);
         } finally {
+            abortRef.current = null;
             setIsLoading(false);
         }
     };
 
+    // Closing the chat cancels any answer still being generated
+    useEffect(() => {
+        if (!isOpen) abortRef.current?.abort();
+    }, [isOpen]);
+    useEffect(() => () => abortRef.current?.abort(), []);
+
     const handleKeyPress = (e) => {
         if (e.key === 'Enter' && !e.shiftKey) {
             e.preventDefault();
@@ -0,0 +1 @@
+# RAG package
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.intent import parse_intent
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cased, whitespace-collapsed form used for exact-match lookups."""
+    return re.sub(r"\s+", " ", question.strip().lower())
+
+
+def intent_signature(question: str) -> Tuple[Any, ...]:
+    """The requirements a near-duplicate must share: budget, socket, RAM type and categories."""
+    intent = parse_intent(question)
+    return intent.budget, intent.socket, intent.ram_type, tuple(intent.categories)
+
+
+def index_fingerprint(chroma_path: str) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of the Chroma SQLite file; changes whenever the vector store is rebuilt."""
+    try:
+        stat = os.stat(os.path.join(chroma_path, "chroma.sqlite3"))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SemanticAnswerCache:
+    """
+    Caches /ask answers keyed by the question's embedding.
+    - exact (normalized) repeats are served without touching the encoder,
+    - near-duplicates are matched by cosine similarity >= threshold, among
+      entries with the same parsed intent ("under 80k" and "under 120k" embed
+      almost identically but need different answers),
+    - bounded LRU with a TTL, and cleared whenever `fingerprint()` changes
+      (i.e. the Chroma collection was rebuilt).
+    Safe to call from worker threads; the encoder runs outside the lock.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], List[float]],
+        fingerprint: Callable[[], Any] = lambda: None,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.embed = embed
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        # normalized question -> (expires_at, unit vector, answer, intent signature)
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray, str, Tuple]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None  # stacked vectors, rebuilt lazily
+        self._keys: List[str] = []
+        self._signatures: List[Tuple] = []
+        self._fingerprint = fingerprint()
+        self._lock = threading.Lock()
+
+    def _check_fingerprint(self):
+        current = self.fingerprint()
+        if current != self._fingerprint:
+            self._clear()
+            self._fingerprint = current
+
+    def _unit_vector(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embed(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, key: str):
+        del self._entries[key]
+        self._matrix = None
+
+    def _nearest(self, vector: np.ndarray, signature: Tuple) -> Optional[str]:
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][1] for key in self._keys])
+            self._signatures = [self._entries[key][3] for key in self._keys]
+        scores = self._matrix @ vector
+        scores[[n for n, other in enumerate(self._signatures) if other != signature]] = -np.inf
+        best = int(np.argmax(scores))
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+    def lookup(self, question: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Returns (cached answer or None, question vector). The vector is handed
+        back so a miss can be stored without embedding the question twice.
+        """
+        key = normalize_question(question)
+        vector = None
+        with self._lock:
+            self._check_fingerprint()
+            exact = key in self._entries
+        if not exact:
+            vector = self._unit_vector(question)
+            signature = intent_signature(question)
+
+        with self._lock:
+            if not exact:
+                key = self._nearest(vector, signature)
+            if key is not None and key in self._entries:
+                expires_at, _, answer, _ = self._entries[key]
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return answer, vector
+                self._drop(key)
+
+            self.misses += 1
+            return None, vector
+
+    def store(self, question: str, answer: str, vector: Optional[np.ndarray] = None):
+        key = normalize_question(question)
+        if vector is None:
+            vector = self._unit_vector(question)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector, answer, intent_signature(question))
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,155 @@
+"""
+The RAG components: embedding model, Chroma vector store, LLM backend and the
+LCEL chain tying them together.
+
+LangChain, sentence-transformers and Chroma are imported inside the loaders,
+so importing this module (and main.py) stays cheap; rag/runtime.py calls the
+loaders on a worker thread after the API is already serving.
+"""
+
+import os
+
+# --- Configuration ---
+CHROMA_DB_PATH = "./pc_parts_vector_db_free"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+OLLAMA_MODEL = "phi3:mini"  # Using the available model instead of llama3
+# "chroma", or "matrix" for the in-memory NumPy store exported from it (see rag/matrix_store.py)
+RAG_VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "chroma")
+
+PROMPT_TEMPLATE = """
+    You are an expert PC builder AI. Your task is to recommend a **complete and fully compatible** PC build based ONLY on the parts provided in the context below.
+    You MUST adhere to the following rules:
+    1.  **Compatibility:** Ensure the CPU socket (AM5, LGA1700, AM4), Motherboard socket, and RAM type (DDR4 or DDR5) **match**.
+    2.  **Budget:** Adhere strictly to the user's requested budget.
+    3.  **Output:** List the recommended parts, their prices, and the total cost. State explicitly if the build is compatible.
+
+    CONTEXT:
+    {context}
+
+    VERIFIED COMPATIBLE BUILDS (from the shop's build optimizer; prefer these when they fit the request):
+    {builds}
+
+    CONVERSATION SO FAR:
+    {history}
+
+    USER REQUEST: {question}
+
+    RECOMMENDATION:
+    """
+
+
+def load_embeddings(cached: bool = True):
+    """
+    Loads the FREE embedding model (same as used for creation) and runs it once so the first query is warm.
+    With `cached`, it is wrapped in the on-disk embedding cache so repeated texts skip the encoder.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from rag.embedding_cache import CachedEmbeddings, open_embedding_cache
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={'device': 'cpu'}
+    )
+    embeddings.embed_query("warm-up")
+    cache = open_embedding_cache(CHROMA_DB_PATH, EMBEDDING_MODEL) if cached else None
+    return CachedEmbeddings(embeddings, cache) if cache is not None else embeddings
+
+
+def load_vectorstore(embeddings, backend: str = "chroma"):
+    from langchain_community.vectorstores import Chroma
+
+    vectorstore = Chroma(
+        persist_directory=CHROMA_DB_PATH,
+        embedding_function=embeddings
+    )
+    print(f"✅ ChromaDB loaded from {CHROMA_DB_PATH}")
+    if backend == "matrix":
+        return load_matrix_store(vectorstore, embeddings)
+    return vectorstore
+
+
+def load_matrix_store(chroma, embeddings):
+    """The matrix store, re-exported from Chroma first when Chroma changed since the last export."""
+    from rag.answer_cache import index_fingerprint
+    from rag.matrix_store import MATRIX_STORE_PATH, MatrixVectorStore, export_from_chroma, read_store_meta
+
+    fingerprint = index_fingerprint(CHROMA_DB_PATH)
+    meta = read_store_meta(MATRIX_STORE_PATH)
+    if meta is None or meta.get("source_fingerprint") != (list(fingerprint) if fingerprint else None):
+        print(f"➡️ Exporting Chroma vectors to {MATRIX_STORE_PATH}...")
+        export_from_chroma(chroma, MATRIX_STORE_PATH, EMBEDDING_MODEL, fingerprint)
+    store = MatrixVectorStore(MATRIX_STORE_PATH, embeddings)
+    print(f"✅ Matrix store loaded from {MATRIX_STORE_PATH} ({len(store)} vectors)")
+    return store
+
+
+def load_llm():
+    """The FREE local LLM: Ollama by default, or another backend chosen by LLM_BACKEND (see rag/llm.py)."""
+    from rag.llm import LLM_BACKEND, create_backend
+
+    llm = create_backend(LLM_BACKEND, OLLAMA_MODEL)
+    print(f"✅ LLM backend {llm.name} ({llm.model or 'server default'}) configured")
+    return llm
+
+
+def make_retriever(vectorstore, embeddings):
+    """Per-category filtered searches guided by the question's budget/socket/category intent."""
+    from rag.retriever import HybridRetriever
+
+    return HybridRetriever(vectorstore=vectorstore, embeddings=embeddings)
+
+
+def build_chain(retriever, llm):
+    """
+    Creates the RAG chain using LCEL. Input is the question, or a dict with
+    `question` plus optional `history` (chat session), `retrieval_query` and
+    pre-fetched `parts` (reused from the previous turn, skipping retrieval).
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.runnables import RunnableLambda
+
+    from rag.context import build_context, count_tokens, prompt_stats
+    from rag.tools import optimizer_context
+
+    rag_prompt = PromptTemplate(template=PROMPT_TEMPLATE, input_variables=["context", "builds", "history", "question"])
+
+    def as_inputs(value):
+        return value if isinstance(value, dict) else {"question": value}
+
+    def retrieve(inputs):
+        if inputs.get("parts") is not None:
+            return inputs["parts"]
+        return retriever.invoke(inputs.get("retrieval_query") or inputs["question"])
+
+    async def aretrieve(inputs):
+        if inputs.get("parts") is not None:
+            return inputs["parts"]
+        return await retriever.ainvoke(inputs.get("retrieval_query") or inputs["question"])
+
+    async def builds(inputs):
+        return await optimizer_context(inputs["question"])
+
+    def fill_prompt(inputs):
+        # Compact part cards instead of raw page_content; logs the prompt size per request
+        context = inputs["context"]
+        prompt = rag_prompt.format(context=context["text"], builds=inputs["builds"],
+                                   history=inputs["history"], question=inputs["question"])
+        prompt_stats.record(count_tokens(prompt), context["tokens"], context["parts"])
+        return prompt
+
+    qa_chain = (
+        RunnableLambda(as_inputs)
+        | {
+            "context": RunnableLambda(retrieve, afunc=aretrieve) | RunnableLambda(build_context),
+            "builds": RunnableLambda(builds),
+            "history": RunnableLambda(lambda inputs: inputs.get("history") or "None."),
+            "question": RunnableLambda(lambda inputs: inputs["question"]),
+        }
+        | RunnableLambda(fill_prompt)
+        | llm.as_runnable()
+        | StrOutputParser()
+    )
+    print("✅ RAG Chain created successfully!")
+    return qa_chain
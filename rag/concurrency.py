@@ -0,0 +1,84 @@
+"""
+Bounded concurrency for LLM generations.
+
+A local Ollama serves one or two generations at a time; extra requests only
+queue inside Ollama and hold their HTTP connections open. GenerationLimiter
+caps running generations with a semaphore, lets a bounded number wait for a
+slot, and rejects everything beyond that immediately so the API can answer 429.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "8"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60"))
+
+
+class GenerationQueueFull(Exception):
+    """No generation slot is free and the wait queue is full (or the wait timed out)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GenerationLimiter:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def is_full(self) -> bool:
+        # Waiters that are about to take a free slot also count, so bursts can't overshoot the queue
+        return self.active + self.waiting >= self.max_concurrency + self.max_queue
+
+    def retry_after(self) -> int:
+        # Rough guess: every queued request ahead of us needs about one generation slot-turn
+        return max(1, (self.waiting + 1) // max(1, self.max_concurrency)) * 5
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Holds one generation slot for the duration of the block."""
+        if self.is_full():
+            self.rejected += 1
+            raise GenerationQueueFull("The assistant is busy. Please try again shortly.", self.retry_after())
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise GenerationQueueFull("Timed out waiting for the assistant. Please try again.", self.retry_after())
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+# Shared by /ask and /ask/stream
+llm_limiter = GenerationLimiter()
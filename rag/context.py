@@ -0,0 +1,139 @@
+"""
+Compact prompt context for the RAG chain.
+
+The indexed page_content is a long sentence per part that repeats the price and
+specs and often ends in "N/A socket ... N/A RAM". On a CPU-only Ollama prompt
+evaluation time grows linearly with prompt tokens, so the chain renders each
+retrieved part as a one-line card built from the document metadata instead:
+
+    CPU | AMD Ryzen 7 9800X3D | ₹39757 | 8 Cores, 16 Threads, AM5, 5.2 GHz Boost, 120W TDP
+
+Similar parts (same category and specs) are collapsed to the first, best-ranked
+one, and cards are added in retrieval order until RAG_CONTEXT_TOKEN_BUDGET is spent.
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from compatibility import canonical_category
+from spec_parser import parse_price
+
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "800"))
+# Optional Hugging Face tokenizer (e.g. microsoft/Phi-3-mini-4k-instruct) for exact counts
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "")
+
+# Typed metadata fields worth stating when the specs text doesn't already say them
+_TYPED_FIELDS = (("socket", "{}"), ("memory_type", "{}"), ("wattage", "{}W"), ("tdp", "{}W TDP"))
+_SPECS_IN_CONTENT = re.compile(r"Detailed Specs: (.*?)\. COMPATIBILITY HINT", re.DOTALL)
+# Llama-family tokenizers (phi3) split digits one per token and punctuation separately
+_TOKEN_PIECES = re.compile(r"\d|[A-Za-z]+|[^\sA-Za-z\d]")
+
+
+@lru_cache(maxsize=1)
+def _tokenizer():
+    if not PROMPT_TOKENIZER:
+        return None
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(PROMPT_TOKENIZER)
+    except Exception as e:
+        print(f"⚠️ Tokenizer {PROMPT_TOKENIZER} unavailable, estimating prompt tokens instead: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens for `text`: exact with PROMPT_TOKENIZER, otherwise a phi3-style estimate."""
+    tokenizer = _tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    # Words cost about one token per 4 letters; digits and symbols one each
+    return sum(-(-len(piece) // 4) if piece.isalpha() else 1 for piece in _TOKEN_PIECES.findall(text))
+
+
+def _specs(doc) -> str:
+    specs = doc.metadata.get("specs")
+    if specs is None:
+        # Stores indexed before specs were kept in metadata
+        match = _SPECS_IN_CONTENT.search(doc.page_content)
+        specs = match.group(1) if match else ""
+    return specs.strip()
+
+
+def part_card(doc) -> str:
+    """One line per part: category | name | price | specs (+ typed fields the specs don't mention)."""
+    metadata = doc.metadata
+    specs = _specs(doc)
+    fields = [canonical_category(metadata.get("category", "Part")), metadata.get("name", "Unknown part")]
+    price = parse_price(metadata.get("price"))
+    if price is not None:
+        fields.append(f"₹{price:.0f}")
+    extras = [
+        template.format(metadata[key]) for key, template in _TYPED_FIELDS
+        if metadata.get(key) not in (None, "", "N/A") and str(metadata[key]).lower() not in specs.lower()
+    ]
+    details = ", ".join(part for part in [specs] + extras if part)
+    if details:
+        fields.append(details)
+    return " | ".join(fields)
+
+
+def _similarity_key(doc) -> tuple:
+    specs = re.sub(r"\W+", " ", _specs(doc).lower()).strip()
+    return canonical_category(doc.metadata.get("category", "")), specs or doc.metadata.get("name") or doc.page_content
+
+
+def build_context(docs: List[Any], token_budget: int = RAG_CONTEXT_TOKEN_BUDGET) -> Dict[str, Any]:
+    """Cards for `docs` in order, skipping duplicates and similar parts, capped at `token_budget` tokens."""
+    cards: List[str] = []
+    seen_names, seen_similar = set(), set()
+    used = dropped = 0
+    for doc in docs:
+        name = doc.metadata.get("name") or doc.page_content
+        similar = _similarity_key(doc)
+        if name in seen_names or similar in seen_similar:
+            dropped += 1
+            continue
+        card = part_card(doc)
+        cost = count_tokens(card) + 1  # + newline
+        if used + cost > token_budget and cards:
+            break
+        seen_names.add(name)
+        seen_similar.add(similar)
+        cards.append(card)
+        used += cost
+    return {"text": "\n".join(cards), "parts": len(cards), "duplicates": dropped, "tokens": used}
+
+
+class PromptStats:
+    """Running prompt token counts, logged per request so the savings are visible."""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_tokens = 0
+        self.context_tokens = 0
+        self.last: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, prompt_tokens: int, context_tokens: int, parts: int):
+        with self._lock:
+            self.requests += 1
+            self.total_tokens += prompt_tokens
+            self.context_tokens += context_tokens
+            self.last = {"prompt_tokens": prompt_tokens, "context_tokens": context_tokens, "parts": parts}
+        print(f"🧮 Prompt: {prompt_tokens} tokens ({context_tokens} context tokens, {parts} parts)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "avg_prompt_tokens": round(self.total_tokens / self.requests, 1) if self.requests else None,
+                "avg_context_tokens": round(self.context_tokens / self.requests, 1) if self.requests else None,
+                "context_token_budget": RAG_CONTEXT_TOKEN_BUDGET,
+                "tokenizer": PROMPT_TOKENIZER or "estimate",
+                "last": self.last,
+            }
+
+
+prompt_stats = PromptStats()
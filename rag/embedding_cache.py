@@ -0,0 +1,198 @@
+"""
+Disk-backed embedding cache shared by the indexer and the query path.
+
+Vectors are stored as float32 blobs in a small SQLite file next to Chroma's,
+keyed by sha256(model name + text), so re-indexing unchanged parts and
+repeated user questions skip the MiniLM forward pass. The file is bounded by
+EMBEDDING_CACHE_MAX_MB; least recently used vectors are evicted first.
+
+Row and byte totals are kept in memory (the table is only summed at open and
+when an eviction looks due, since the indexer may write the same file), and
+lookups don't write: last_used updates are buffered and flushed in one
+transaction every TOUCH_FLUSH_SECONDS / TOUCH_FLUSH_SIZE keys, or with the
+next insert.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+# Evict down to this share of the limit so eviction doesn't run on every insert
+EVICT_TO = 0.9
+# SQLite caps bound parameters per statement; look keys up in chunks of this many
+_LOOKUP_CHUNK = 500
+TOUCH_FLUSH_SECONDS = 30.0
+TOUCH_FLUSH_SIZE = 256
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha256((model_name + text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """sha256(model + text) -> float32 vector, in SQLite with LRU eviction by size."""
+
+    def __init__(self, path: str, model_name: str, max_mb: float = EMBEDDING_CACHE_MAX_MB):
+        self.path = path
+        self.model_name = model_name
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets the API read while create_local_db.py writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._entries, self._size_bytes = self._totals()
+        self._touched: Dict[str, float] = {}  # key -> last_used not yet written
+        self._last_flush = time.monotonic()
+
+    def _totals(self):
+        return self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+
+    def _select_chunks(self, sql: str, keys: List[str]):
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[start:start + _LOOKUP_CHUNK]
+            yield from self._db.execute(sql.format(marks=",".join("?" * len(chunk))), chunk).fetchall()
+
+    def _flush_touches(self):
+        """Writes buffered last_used times (caller commits)."""
+        if self._touched:
+            self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+        self._last_flush = time.monotonic()
+
+    def get_many(self, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """Cached vectors for whichever of `texts` are present, keyed by text."""
+        keys = {cache_key(self.model_name, text): text for text in texts}
+        found: Dict[str, List[float]] = {}
+        now = time.time()
+        with self._lock:
+            hits = self._select_chunks("SELECT key, vector FROM embeddings WHERE key IN ({marks})", list(keys))
+            for key, blob in hits:
+                found[keys[key]] = np.frombuffer(blob, dtype=np.float32).tolist()
+                self._touched[key] = now
+            if self._touched and (len(self._touched) >= TOUCH_FLUSH_SIZE
+                                  or time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS):
+                self._flush_touches()
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(set(texts)) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, Sequence[float]]):
+        if not vectors:
+            return
+        now = time.time()
+        rows = {
+            cache_key(self.model_name, text): np.asarray(vector, dtype=np.float32).tobytes()
+            for text, vector in vectors.items()
+        }
+        with self._lock:
+            # Replaced rows only change the totals by their size difference
+            old_sizes = dict(self._select_chunks(
+                "SELECT key, LENGTH(vector) FROM embeddings WHERE key IN ({marks})", list(rows)))
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                                 [(key, blob, now) for key, blob in rows.items()])
+            self._entries += len(rows) - len(old_sizes)
+            self._size_bytes += sum(len(blob) for blob in rows.values()) - sum(old_sizes.values())
+            self._flush_touches()
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        # Another process (the indexer) may have written the file too; resync before deleting
+        self._entries, self._size_bytes = self._totals()
+        if self._size_bytes <= self.max_bytes or not self._entries:
+            return
+        keep = int(self._entries * self.max_bytes * EVICT_TO / self._size_bytes)
+        victims = self._db.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT ?", (self._entries - keep,)).fetchall()
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", [(key,) for key, _ in victims])
+        self._entries -= len(victims)
+        self._size_bytes -= sum(size for _, size in victims)
+        self.evicted += len(victims)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._entries, self._size_bytes = 0, 0
+            self._touched.clear()
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._db.commit()
+            self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        entries, size = self._entries, self._size_bytes
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evicted": self.evicted,
+        }
+
+
+class CachedEmbeddings:
+    """
+    Wraps a LangChain embeddings object (embed_documents/embed_query) with an
+    EmbeddingCache; only texts missing from the cache reach the wrapped model.
+    """
+
+    def __init__(self, embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(computed)
+            found.update(computed)
+        return [found[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        found = self.cache.get_many([text])
+        if text in found:
+            return found[text]
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many({text: vector})
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+def open_embedding_cache(chroma_path: str, model_name: str) -> Optional[EmbeddingCache]:
+    """The cache file beside chroma.sqlite3, or None when EMBEDDING_CACHE=0."""
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    return EmbeddingCache(os.path.join(chroma_path, "embedding_cache.sqlite3"), model_name)
@@ -0,0 +1,89 @@
+"""
+Question intent parsing shared by retrieval and the build optimizer tool:
+budget, socket, RAM type and which part categories a question is about.
+Kept free of LangChain imports so main.py can use it before the RAG stack loads.
+"""
+import re
+from typing import List, NamedTuple, Optional
+
+from spec_parser import parse_specs
+
+# Canonical categories of a complete build, in the order the context lists them
+BUILD_CATEGORIES = ("CPU", "Motherboard", "RAM", "GPU", "Storage", "PSU", "Case")
+
+CATEGORY_KEYWORDS = {
+    "CPU": ("cpu", "processor", "ryzen", "core i", "intel core"),
+    "Motherboard": ("motherboard", "mobo", "mainboard", "chipset"),
+    "RAM": ("ram", "memory", "ddr4", "ddr5"),
+    "GPU": ("gpu", "graphics", "video card", "rtx", "gtx", "radeon", "rx "),
+    "Storage": ("ssd", "nvme", "hdd", "storage", "hard drive"),
+    "PSU": ("psu", "power supply", "powersupply", "wattage"),
+    "Case": ("case", "cabinet", "chassis", "tower"),
+}
+
+
+def _keyword_pattern(words) -> "re.Pattern":
+    # Whole words ("ram" but not "program", "case" but not "showcase"); a trailing model
+    # number or plural is allowed ("core i7", "rx 7800", "cases")
+    return re.compile(
+        r"(?<![a-z0-9])(?:" + "|".join(re.escape(word.strip()) for word in words) + r")s?(?![a-z])", re.IGNORECASE)
+
+
+_CATEGORY_PATTERNS = {category: _keyword_pattern(words) for category, words in CATEGORY_KEYWORDS.items()}
+
+# Words that mean "the whole build" rather than one component
+BUILD_KEYWORDS = ("build", "pc", "rig", "setup", "computer", "system")
+
+_AMOUNT = re.compile(
+    r"(?P<currency>₹|rs\.?|inr)?\s*(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<scale>k|lakhs?|lacs?|l)?\b",
+    re.IGNORECASE,
+)
+_BUDGET_CUE = re.compile(r"(under|below|within|budget|up\s?to|max(?:imum)?|less than|around|for)\W*$", re.IGNORECASE)
+# "4k gaming", "8k monitor": a display resolution, not ₹4,000
+_RESOLUTION_AFTER = re.compile(
+    r"\s*(gaming|games?|monitors?|displays?|screens?|resolution|res\b|video|editing|tv|hdr|ultra|@|\d+\s?(?:hz|fps))",
+    re.IGNORECASE,
+)
+_RESOLUTION_K = (2, 4, 5, 8)
+_SCALES = {"k": 1_000, "l": 100_000, "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000}
+
+
+class QueryIntent(NamedTuple):
+    budget: Optional[float]
+    socket: Optional[str]
+    ram_type: Optional[str]
+    categories: List[str]  # canonical categories to search
+    whole_build: bool = False  # asks for a complete build (a build word, no specific categories)
+
+
+def parse_budget(question: str) -> Optional[float]:
+    """'gaming pc under ₹80,000' / 'budget 1.2 lakh' / 'within 75k' -> rupees."""
+    for match in _AMOUNT.finditer(question):
+        number = float(match.group("number").replace(",", ""))
+        scale = (match.group("scale") or "").lower()
+        amount = number * _SCALES.get(scale, 1)
+        currency = bool(match.group("currency"))
+        if not currency and scale == "k" and number in _RESOLUTION_K and _RESOLUTION_AFTER.match(question, match.end()):
+            continue
+        # Numbers (scaled or not) only count as money with a currency marker or right after a budget
+        # word: "under 80000" / "within 75k", not "650W" or "4k gaming pc"
+        cued = bool(_BUDGET_CUE.search(question[:match.start()]))
+        if (currency or cued) and amount >= 1000:
+            return amount
+    return None
+
+
+def mentioned_categories(question: str) -> List[str]:
+    """Canonical categories the question names, in BUILD_CATEGORIES order."""
+    return [category for category, pattern in _CATEGORY_PATTERNS.items() if pattern.search(question)]
+
+
+def parse_intent(question: str) -> QueryIntent:
+    text = f" {question.lower()} "
+    # The motherboard extractor knows both sockets and RAM types
+    specs = parse_specs("Motherboard", question)
+    named = mentioned_categories(question)
+    # Named categories win over build words: "which GPU fits my build?" is a GPU question
+    categories = named or list(BUILD_CATEGORIES)
+    whole_build = not named and any(re.search(rf"\b{word}\b", text) for word in BUILD_KEYWORDS)
+    return QueryIntent(parse_budget(question), specs["socket"], specs["ram_type"], categories, whole_build)
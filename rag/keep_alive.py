@@ -0,0 +1,145 @@
+"""
+Keeps the Ollama model resident.
+
+Ollama unloads an idle model after its keep_alive (5 minutes by default), and
+reloading phi3:mini on CPU takes 10+ seconds, which the next /ask would pay.
+ModelKeeper:
+- loads the model at startup with an empty-prompt generate (Ollama's way to
+  load a model without producing tokens) and an explicit keep_alive,
+- while /ask traffic is active, re-sends that load request every
+  OLLAMA_HEARTBEAT_SECONDS so the model never reaches its idle unload; after
+  OLLAMA_IDLE_AFTER_SECONDS without traffic it stops and lets Ollama free the RAM,
+- reads /api/ps to report whether the model is actually loaded.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import httpx
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_HEARTBEAT_SECONDS = float(os.getenv("OLLAMA_HEARTBEAT_SECONDS", "240"))
+OLLAMA_IDLE_AFTER_SECONDS = float(os.getenv("OLLAMA_IDLE_AFTER_SECONDS", "1800"))
+# Loading a model from disk on CPU can be slow; status checks should not be
+OLLAMA_LOAD_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_LOAD_TIMEOUT_SECONDS", "120"))
+OLLAMA_STATUS_TIMEOUT_SECONDS = 2.0
+
+
+class ModelKeeper:
+    def __init__(
+        self,
+        model: str,
+        base_url: str = OLLAMA_BASE_URL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        heartbeat_seconds: float = OLLAMA_HEARTBEAT_SECONDS,
+        idle_after_seconds: float = OLLAMA_IDLE_AFTER_SECONDS,
+    ):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_after_seconds = idle_after_seconds
+        self.state = "pending"  # pending -> loading -> loaded | unloaded | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.expires_at: Optional[str] = None
+        self.heartbeats = 0
+        self.last_heartbeat: Optional[float] = None
+        self.last_activity = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.state == "loaded"
+
+    def touch(self):
+        """Marks LLM traffic; the heartbeat keeps the model loaded while this is recent."""
+        self.last_activity = time.monotonic()
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() - self.last_activity < self.idle_after_seconds
+
+    async def load(self) -> bool:
+        """Loads the model (or extends its keep_alive); True when Ollama has it in memory."""
+        if self.state != "loaded":
+            self.state = "loading"
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=OLLAMA_LOAD_TIMEOUT_SECONDS) as client:
+                response = await client.post(
+                    "/api/generate", json={"model": self.model, "prompt": "", "keep_alive": self.keep_alive, "stream": False})
+                response.raise_for_status()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e) or type(e).__name__
+            return False
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.error = None
+        await self.refresh()
+        return self.loaded
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Reads Ollama's running models (/api/ps) into the loaded state."""
+        try:
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=OLLAMA_STATUS_TIMEOUT_SECONDS) as client:
+                response = await client.get("/api/ps")
+                response.raise_for_status()
+                running = response.json().get("models") or []
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            return self.status()
+        entry = next((m for m in running if m.get("name") == self.model or m.get("model") == self.model), None)
+        self.state = "loaded" if entry else "unloaded"
+        self.expires_at = entry.get("expires_at") if entry else None
+        return self.status()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            if not self.active:
+                await self.refresh()
+                continue
+            self.heartbeats += 1
+            self.last_heartbeat = time.time()
+            if not await self.load():
+                print(f"⚠️ Ollama heartbeat for {self.model} failed: {self.error}")
+
+    async def run(self):
+        """Warm-up, then heartbeat until cancelled."""
+        print(f"➡️ Warming up Ollama model {self.model} (keep_alive={self.keep_alive})...")
+        if await self.load():
+            print(f"✅ Ollama model {self.model} loaded in {self.load_seconds:.1f}s")
+        else:
+            print(f"⚠️ Ollama warm-up failed ({self.error}); the heartbeat will retry")
+        await self._heartbeat()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "state": self.state,
+            "loaded": self.loaded,
+            "expires_at": self.expires_at,
+            "keep_alive": self.keep_alive,
+            "load_seconds": self.load_seconds,
+            "traffic_active": self.active,
+            "heartbeats": self.heartbeats,
+            "last_heartbeat": (datetime.fromtimestamp(self.last_heartbeat, timezone.utc).isoformat()
+                               if self.last_heartbeat else None),
+            "error": self.error,
+        }
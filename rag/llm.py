@@ -0,0 +1,291 @@
+"""
+LLM backends for the RAG chain.
+
+The chain talks to the model through LLMBackend instead of LangChain's Ollama
+class, so the transport is under our control:
+- one pooled httpx.AsyncClient per backend (keep-alive connections, bounded pool),
+- explicit connect/read timeouts, so a hung server fails the request instead of
+  holding a worker forever (the read timeout applies between streamed chunks),
+- a circuit breaker: after LLM_BREAKER_FAILURES consecutive failures (transport
+  errors, timeouts or errors inside the stream) requests fail fast with
+  LLMUnavailable for LLM_BREAKER_RESET_SECONDS, then a single trial request
+  decides whether to close it again.
+
+LLM_BACKEND selects the implementation: "ollama" (default), "llamacpp" (a
+llama.cpp `llama-server`) or "stub" (in-process canned answers, for tests and
+demos without a model).
+"""
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+
+from rag.keep_alive import OLLAMA_BASE_URL, OLLAMA_KEEP_ALIVE
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")
+LLAMACPP_BASE_URL = os.getenv("LLAMACPP_BASE_URL", "http://localhost:8080")
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "3"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "60"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "4"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "512"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+STUB_LLM_RESPONSE = os.getenv(
+    "STUB_LLM_RESPONSE", "This is a stub answer. Set LLM_BACKEND=ollama to use the local model.")
+
+
+class LLMUnavailable(Exception):
+    """The LLM backend is unreachable, timed out, or its circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """closed -> (N consecutive failures) -> open -> (reset period) -> half_open -> closed / open."""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_running = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 1
+        return max(1, int(self.reset_seconds - (time.monotonic() - self.opened_at)) + 1)
+
+    def before_request(self):
+        """Raises LLMUnavailable while open; lets exactly one trial through when half-open."""
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self.trial_running:
+            self.trial_running = True
+            return
+        self.rejected += 1
+        raise LLMUnavailable("The language model is unavailable. Please try again shortly.", self.retry_after())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_running or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+
+class LLMBackend(ABC):
+    """Streams completion text for a prompt; subclasses implement _stream."""
+
+    name = "base"
+    model = ""
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None):
+        self.breaker = breaker or CircuitBreaker()
+        self.requests = 0
+        self.failures = 0
+
+    @abstractmethod
+    def _stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yields the completion for `prompt` as text chunks (an async generator)."""
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        self.breaker.before_request()
+        self.requests += 1
+        produced = False
+        try:
+            async for chunk in self._stream(prompt):
+                if not produced:
+                    # The backend answered; later stalls are per-request read timeouts, not an outage
+                    produced = True
+                    self.breaker.record_success()
+                yield chunk
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            self.failures += 1
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                # The server is up but refused this request (e.g. unknown model)
+                self.breaker.record_success()
+                raise
+            self.breaker.record_failure()
+            reason = "timed out" if isinstance(e, httpx.TimeoutException) else f"failed ({type(e).__name__})"
+            raise LLMUnavailable(f"The {self.name} backend {reason}. Please try again shortly.",
+                                 self.breaker.retry_after()) from e
+        except asyncio.CancelledError:
+            # Client went away mid-generation; says nothing about backend health
+            if not produced and self.breaker.trial_running:
+                self.breaker.trial_running = False
+            raise
+        except Exception as e:
+            # In-stream errors (Ollama error lines, malformed NDJSON/SSE); counted like an outage so a
+            # half-open trial always resolves instead of leaving the breaker stuck
+            self.failures += 1
+            self.breaker.record_failure()
+            raise LLMUnavailable(f"The {self.name} backend failed ({type(e).__name__}). Please try again shortly.",
+                                 self.breaker.retry_after()) from e
+        if not produced:
+            self.breaker.record_success()
+
+    async def ainvoke(self, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.astream(prompt)])
+
+    async def aclose(self):
+        pass
+
+    def as_runnable(self):
+        """The backend as an LCEL step (prompt string in, text chunks out)."""
+        from langchain_core.runnables import RunnableGenerator
+
+        async def atransform(prompts: AsyncIterator[str]) -> AsyncIterator[str]:
+            prompt = "".join([part async for part in prompts])
+            async for chunk in self.astream(prompt):
+                yield chunk
+
+        def transform(prompts: Iterator[str]) -> Iterator[str]:
+            # Sync invoke (scripts, notebooks): runs the async stream on a fresh event loop
+            yield asyncio.run(self.ainvoke("".join(prompts)))
+
+        return RunnableGenerator(transform, atransform, name=f"{self.name}_llm")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model": self.model,
+            "requests": self.requests,
+            "failures": self.failures,
+            "circuit_breaker": self.breaker.stats(),
+        }
+
+
+class HTTPBackend(LLMBackend):
+    """Shared pooled-client setup for HTTP model servers."""
+
+    def __init__(self, base_url: str, breaker: Optional[CircuitBreaker] = None):
+        super().__init__(breaker)
+        self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # httpx clients are bound to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def status(self) -> Dict[str, Any]:
+        return {**super().status(), "base_url": self.base_url}
+
+
+class OllamaBackend(HTTPBackend):
+    name = "ollama"
+
+    def __init__(self, model: str, base_url: str = OLLAMA_BASE_URL, keep_alive: str = OLLAMA_KEEP_ALIVE, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.model = model
+        self.keep_alive = keep_alive
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {"num_predict": LLM_MAX_TOKENS},
+        }
+        # Ollama streams one JSON object per line
+        async with self.client.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(f"Ollama error: {data['error']}")
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    return
+
+
+class LlamaCppBackend(HTTPBackend):
+    name = "llamacpp"
+
+    def __init__(self, model: str = "", base_url: str = LLAMACPP_BASE_URL, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.model = model  # llama-server serves the one model it was started with
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        payload = {"prompt": prompt, "stream": True, "n_predict": LLM_MAX_TOKENS, "cache_prompt": True}
+        # llama-server streams Server-Sent Events: `data: {"content": ..., "stop": bool}`
+        async with self.client.stream("POST", "/completion", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):])
+                if data.get("content"):
+                    yield data["content"]
+                if data.get("stop"):
+                    return
+
+
+class StubBackend(LLMBackend):
+    """Answers every prompt with a canned response, streamed word by word."""
+
+    name = "stub"
+
+    def __init__(self, response: str = STUB_LLM_RESPONSE, delay_seconds: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.model = "stub"
+        self.response = response
+        self.delay_seconds = delay_seconds
+        self.prompts = []
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        self.prompts.append(prompt)
+        for n, word in enumerate(self.response.split(" ")):
+            if self.delay_seconds:
+                await asyncio.sleep(self.delay_seconds)
+            yield word if n == 0 else " " + word
+
+
+BACKENDS = {"ollama": OllamaBackend, "llamacpp": LlamaCppBackend, "stub": StubBackend}
+
+
+def create_backend(name: str = LLM_BACKEND, model: str = "") -> LLMBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "stub":
+        return StubBackend()
+    return BACKENDS[name](model=model)
@@ -0,0 +1,207 @@
+"""
+In-memory vector store over a memory-mapped NumPy matrix, as an alternative to Chroma.
+
+The catalog fits in RAM (384-d float32 MiniLM vectors are ~150 MB for 100k
+parts), so exact search is a single matrix-vector product: no SQLite round trip
+or HNSW graph walk per query. The store is a directory holding:
+- vectors.f32: one contiguous row-major float32 matrix of unit-length rows,
+  opened with np.memmap so the OS page cache shares it between workers,
+- documents.json: ids, page_content and metadata, parallel to the rows,
+- meta.json: shape, embedding model and the Chroma file it was exported from.
+
+similarity_search_by_vector() takes the same Chroma-style filters as
+HybridRetriever already sends ({"category": ...}, {"$in": [...]}, {"$and": [...]},
+$gt/$gte/$lt/$lte/$ne), evaluated as boolean masks over per-field metadata
+arrays, then ranks the masked rows with argpartition.
+
+Select it with RAG_VECTOR_BACKEND=matrix; it is exported from (and re-exported
+whenever) the Chroma store at CHROMA_DB_PATH changes.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MATRIX_STORE_PATH = os.getenv("MATRIX_STORE_PATH", "./pc_parts_vector_matrix")
+
+_COMPARISONS = {
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def write_matrix_store(
+    path: str,
+    ids: Sequence[str],
+    vectors: Any,
+    documents: Sequence[str],
+    metadatas: Sequence[Optional[Dict[str, Any]]],
+    model: str = "",
+    source_fingerprint: Any = None,
+):
+    """Writes a store directory; files are replaced atomically so readers never see a half-written matrix."""
+    matrix = _unit_rows(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+    os.makedirs(path, exist_ok=True)
+
+    tmp = os.path.join(path, "vectors.f32.tmp")
+    out = np.memmap(tmp, dtype=np.float32, mode="w+", shape=matrix.shape) if len(ids) else None
+    if out is not None:
+        out[:] = matrix
+        out.flush()
+        del out
+    else:
+        open(tmp, "wb").close()
+
+    docs_tmp = os.path.join(path, "documents.json.tmp")
+    with open(docs_tmp, "w", encoding="utf-8") as f:
+        json.dump({"ids": list(ids), "documents": list(documents), "metadatas": [m or {} for m in metadatas]}, f,
+                  ensure_ascii=False)
+    meta_tmp = os.path.join(path, "meta.json.tmp")
+    with open(meta_tmp, "w", encoding="utf-8") as f:
+        json.dump({"count": matrix.shape[0], "dim": matrix.shape[1] if len(ids) else 0, "model": model,
+                   "source_fingerprint": source_fingerprint}, f)
+
+    os.replace(tmp, os.path.join(path, "vectors.f32"))
+    os.replace(docs_tmp, os.path.join(path, "documents.json"))
+    os.replace(meta_tmp, os.path.join(path, "meta.json"))
+
+
+def export_from_chroma(vectorstore, path: str = MATRIX_STORE_PATH, model: str = "", source_fingerprint: Any = None):
+    """Copies every vector, document and metadata out of a LangChain Chroma store into a matrix store."""
+    stored = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+    write_matrix_store(path, stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"],
+                       model=model, source_fingerprint=source_fingerprint)
+
+
+def read_store_meta(path: str = MATRIX_STORE_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class MatrixVectorStore:
+    """Exact cosine search over a memory-mapped float32 matrix (duck-types the Chroma methods the RAG stack uses)."""
+
+    def __init__(self, path: str = MATRIX_STORE_PATH, embeddings=None):
+        self.path = path
+        self.embeddings = embeddings
+        self.meta = read_store_meta(path) or {}
+        with open(os.path.join(path, "documents.json"), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        self.ids: List[str] = stored["ids"]
+        self.documents: List[str] = stored["documents"]
+        self.metadatas: List[Dict[str, Any]] = stored["metadatas"]
+        count, dim = self.meta.get("count", len(self.ids)), self.meta.get("dim", 0)
+        self.matrix = (np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+                       if count else np.zeros((0, dim), dtype=np.float32))
+        # Per-field metadata arrays, parallel to the matrix rows, built on first use
+        self._columns: Dict[str, np.ndarray] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # --- Filters ---
+
+    def _column(self, key: str) -> np.ndarray:
+        if key not in self._columns:
+            self._columns[key] = np.array([m.get(key) for m in self.metadatas], dtype=object)
+        return self._columns[key]
+
+    def _numeric_column(self, key: str) -> np.ndarray:
+        if key not in self._numeric:
+            values = np.full(len(self.metadatas), np.nan)
+            for row, metadata in enumerate(self.metadatas):
+                try:
+                    values[row] = float(metadata.get(key))
+                except (TypeError, ValueError):
+                    pass
+            self._numeric[key] = values
+        return self._numeric[key]
+
+    def _field_mask(self, key: str, condition: Any) -> np.ndarray:
+        if not isinstance(condition, dict):
+            return self._column(key) == condition
+        mask = np.ones(len(self.ids), dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                mask &= self._column(key) == value
+            elif op == "$ne":
+                mask &= self._column(key) != value
+            elif op in ("$in", "$nin"):
+                hit = np.zeros(len(self.ids), dtype=bool)
+                column = self._column(key)
+                for option in value:
+                    hit |= column == option
+                mask &= hit if op == "$in" else ~hit
+            elif op in _COMPARISONS:
+                with np.errstate(invalid="ignore"):
+                    mask &= _COMPARISONS[op](self._numeric_column(key), float(value))
+            else:
+                raise ValueError(f"Unsupported filter operator {op}")
+        return mask
+
+    def filter_mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style `where` filter (None = every row)."""
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.filter_mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self.filter_mask(clause) for clause in condition])
+            else:
+                mask &= self._field_mask(key, condition)
+        return mask
+
+    # --- Search ---
+
+    def search(self, vector: Sequence[float], k: int = 4, where: Optional[Dict[str, Any]] = None):
+        """(row indices, cosine scores) of the top-k rows, best first."""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        mask = self.filter_mask(where)
+        rows = np.flatnonzero(mask) if mask is not None else None
+        if rows is not None and rows.size == 0 or len(self.ids) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        # One matrix-vector product over the candidate rows
+        scores = (self.matrix[rows] if rows is not None else self.matrix) @ query
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return (rows[top] if rows is not None else top), scores[top]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs):
+        from langchain_core.documents import Document
+
+        rows, _ = self.search(embedding, k, filter)
+        return [Document(page_content=self.documents[row], metadata=self.metadatas[row]) for row in rows]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k, filter)
+
+    def get(self, include: Sequence[str] = ("metadatas", "documents"), **kwargs) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"ids": list(self.ids)}
+        if "metadatas" in include:
+            result["metadatas"] = list(self.metadatas)
+        if "documents" in include:
+            result["documents"] = list(self.documents)
+        if "embeddings" in include:
+            result["embeddings"] = np.asarray(self.matrix)
+        return result
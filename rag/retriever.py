@@ -0,0 +1,106 @@
+"""
+Hybrid structured + vector retrieval for the RAG chain.
+
+A single top-k similarity search over the whole catalog can't ground a full
+build: with k=4 most categories never make it into the prompt. HybridRetriever
+instead reads the intent out of the question (budget, socket, RAM type, which
+categories are asked about), embeds the question once and runs one metadata-
+filtered vector search per category in parallel. The budget is part of the same
+filter (a `price` ceiling on the numeric price metadata create_local_db.py
+stores), so cheaper matches are found even when the nearest parts are over it.
+The per-category hits are merged round-robin; rag/context.py then fits them
+into the prompt's token budget.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from compatibility import CATEGORY_ALIASES
+from rag.intent import QueryIntent, parse_intent
+
+RAG_PER_CATEGORY_K = int(os.getenv("RAG_PER_CATEGORY_K", "3"))
+
+# Rough share of the total budget each category usually takes; a part may use up
+# to BUDGET_SLACK times its share before it is dropped as unaffordable
+BUDGET_SHARE = {"CPU": 0.22, "Motherboard": 0.14, "RAM": 0.08, "GPU": 0.35, "Storage": 0.08, "PSU": 0.07, "Case": 0.06}
+BUDGET_SLACK = 2.0
+
+
+def category_names(category: str) -> List[str]:
+    """Every name a canonical category may be stored under (e.g. PSU / PowerSupply)."""
+    return [category] + [alias for alias, canonical in CATEGORY_ALIASES.items() if canonical == category]
+
+
+def metadata_filter(category: str, intent: QueryIntent, with_specs: bool = True) -> Dict[str, Any]:
+    names = category_names(category)
+    clauses: List[Dict[str, Any]] = [{"category": names[0]} if len(names) == 1 else {"category": {"$in": names}}]
+    if with_specs and intent.socket and category in ("CPU", "Motherboard"):
+        clauses.append({"socket": intent.socket})
+    if with_specs and intent.ram_type and category in ("RAM", "Motherboard"):
+        clauses.append({"memory_type": intent.ram_type})
+    ceiling = price_ceiling(category, intent.budget)
+    if ceiling is not None:
+        clauses.append({"price": {"$lte": ceiling}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def price_ceiling(category: str, budget: Optional[float]) -> Optional[float]:
+    if budget is None:
+        return None
+    return min(budget, budget * BUDGET_SHARE.get(category, 0.1) * BUDGET_SLACK)
+
+
+def interleave(per_category: List[List[Document]]) -> List[Document]:
+    """Round-robin over categories (best hit of each first), skipping repeats of the same part."""
+    merged: List[Document] = []
+    seen = set()
+    for rank in range(max((len(hits) for hits in per_category), default=0)):
+        for hits in per_category:
+            if rank >= len(hits):
+                continue
+            doc = hits[rank]
+            key = doc.metadata.get("name") or doc.page_content
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+    return merged
+
+
+class HybridRetriever(BaseRetriever):
+    """LangChain retriever running per-category filtered searches over a Chroma store."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    embeddings: Any
+    per_category_k: int = RAG_PER_CATEGORY_K
+
+    def _search_category(self, vector: List[float], category: str, intent: QueryIntent) -> List[Document]:
+        k = self.per_category_k
+        hits = self.vectorstore.similarity_search_by_vector(vector, k=k, filter=metadata_filter(category, intent))
+        if not hits and (intent.socket or intent.ram_type):
+            # Nothing matches the requested socket/RAM type; better to show the closest parts than none
+            hits = self.vectorstore.similarity_search_by_vector(
+                vector, k=k, filter=metadata_filter(category, intent, with_specs=False))
+        return hits
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        intent = parse_intent(query)
+        vector = self.embeddings.embed_query(query)
+        with ThreadPoolExecutor(max_workers=len(intent.categories)) as pool:
+            per_category = list(pool.map(lambda category: self._search_category(vector, category, intent), intent.categories))
+        return interleave(per_category)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        intent = parse_intent(query)
+        vector = await asyncio.to_thread(self.embeddings.embed_query, query)
+        per_category = await asyncio.gather(*(
+            asyncio.to_thread(self._search_category, vector, category, intent) for category in intent.categories
+        ))
+        return interleave(list(per_category))
@@ -0,0 +1,123 @@
+"""
+Background initialization of the RAG stack.
+
+The API starts serving as soon as FastAPI is up; RagRuntime then loads the
+embedding model, vector store, LLM client and chain one after another on a
+worker thread, recording each component's state and load time. /ask returns
+503 with Retry-After until `ready` is true. Meanwhile, with the Ollama
+backend, the model is loaded and then kept resident by rag/keep_alive.py.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from rag.answer_cache import SemanticAnswerCache, index_fingerprint
+from rag.chain import (
+    CHROMA_DB_PATH, OLLAMA_MODEL, RAG_VECTOR_BACKEND, build_chain, load_embeddings, load_llm, load_vectorstore,
+    make_retriever,
+)
+from rag.keep_alive import ModelKeeper
+from rag.llm import LLM_BACKEND, LLMBackend
+
+RAG_RETRY_AFTER_SECONDS = int(os.getenv("RAG_RETRY_AFTER_SECONDS", "10"))
+
+COMPONENTS = ("embeddings", "vectorstore", "llm", "chain")
+
+
+class RagRuntime:
+    def __init__(self):
+        self.state: Dict[str, str] = {name: "pending" for name in COMPONENTS}
+        self.seconds: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.chain = None
+        self.embeddings = None
+        self.vectorstore = None
+        self.retriever = None
+        self.llm: Optional[LLMBackend] = None
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self.model_keeper = ModelKeeper(OLLAMA_MODEL)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.chain is not None and self.answer_cache is not None
+
+    @property
+    def failed(self) -> bool:
+        return bool(self.errors)
+
+    async def _load(self, name: str, loader: Callable, *args) -> Any:
+        self.state[name] = "loading"
+        started = time.perf_counter()
+        try:
+            component = await asyncio.to_thread(loader, *args)
+        except Exception as e:
+            self.state[name] = "failed"
+            self.errors[name] = str(e)
+            raise
+        self.seconds[name] = round(time.perf_counter() - started, 3)
+        self.state[name] = "ready"
+        return component
+
+    async def initialize(self):
+        print("➡️ Initializing RAG components in the background...")
+        started = time.perf_counter()
+        try:
+            self.embeddings = await self._load("embeddings", load_embeddings)
+            self.vectorstore = await self._load("vectorstore", load_vectorstore, self.embeddings, RAG_VECTOR_BACKEND)
+            self.llm = await self._load("llm", load_llm)
+            chain = await self._load("chain", self._build_chain)
+        except Exception as e:
+            print(f"❌ RAG initialization failed: {e}")
+            return
+
+        # Reuses the retriever's MiniLM model; cleared whenever the Chroma store is rebuilt
+        self.answer_cache = SemanticAnswerCache(
+            embed=self.embeddings.embed_query,
+            fingerprint=lambda: index_fingerprint(CHROMA_DB_PATH),
+        )
+        self.chain = chain
+        print(f"✅ RAG ready in {time.perf_counter() - started:.1f}s")
+
+    def _build_chain(self):
+        # The retriever is kept so chat sessions can fetch (and later reuse) parts themselves
+        self.retriever = make_retriever(self.vectorstore, self.embeddings)
+        return build_chain(self.retriever, self.llm)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.initialize())
+        # The model loads inside Ollama, so it warms up alongside the embedding model
+        if LLM_BACKEND == "ollama":
+            self.model_keeper.start()
+
+    async def stop(self):
+        await self.model_keeper.stop()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.llm is not None:
+            await self.llm.aclose()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "components": {
+                name: {
+                    "state": self.state[name],
+                    "seconds": self.seconds.get(name),
+                    "error": self.errors.get(name),
+                }
+                for name in COMPONENTS
+            },
+            "llm_backend": self.llm.status() if self.llm is not None else {"backend": LLM_BACKEND},
+            "llm_model": self.model_keeper.status() if LLM_BACKEND == "ollama" else None,
+        }
+
+
+# Shared instance started by main.py
+rag_runtime = RagRuntime()
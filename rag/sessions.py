@@ -0,0 +1,214 @@
+"""
+Chat sessions for /ask: per-user conversation memory with a bounded prompt.
+
+Each session document in `chat_sessions` holds:
+- messages: the chat log shown to the user (capped at CHAT_MAX_LOG_MESSAGES),
+- window: the most recent messages, quoted verbatim in the prompt,
+- summary: rolling extractive notes on messages folded out of the window
+  whenever the rendered history passes CHAT_HISTORY_TOKEN_BUDGET (oldest
+  notes are dropped past CHAT_SUMMARY_TOKEN_BUDGET),
+- facts: requirements stated so far (budget, use case, socket, RAM type), so a
+  follow-up like "make it cheaper" still retrieves within the right constraints,
+- last_parts: the parts retrieved for the previous answer, reused only when the
+  follow-up explicitly reworks that build ("cheaper", "instead", "swap ...")
+  with the same budget and use case; anything else is retrieved again.
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from rag.context import count_tokens
+from rag.intent import mentioned_categories, parse_intent
+from rag.tools import parse_use_case
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "400"))
+CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", "150"))
+CHAT_MAX_LOG_MESSAGES = int(os.getenv("CHAT_MAX_LOG_MESSAGES", "200"))
+# Longest a single quoted message may be in the prompt; the full text stays in the log
+CHAT_MESSAGE_CHAR_LIMIT = 600
+# The latest exchange (question + answer) always stays verbatim
+MIN_WINDOW_MESSAGES = 2
+SUMMARY_NOTE_CHARS = 160
+
+# Follow-ups that explicitly rework the previous recommendation rather than ask something new
+_REFINEMENT = re.compile(
+    r"\b(cheaper|pricier|less expensive|more expensive|more affordable|instead|swap|replace|switch (?:to|out)|"
+    r"upgrade|downgrade|alternatives?|other options?|same build|(?:lower|reduce|cut) (?:the )?(?:cost|price|total))\b",
+    re.IGNORECASE,
+)
+# Requirements that decide what retrieval should find; when one changes, stored parts are stale
+_RETRIEVAL_FACTS = ("budget", "use_case")
+
+
+# --- Persistence ---
+
+async def create_session(collection, user_id: str) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    session = {
+        "user_id": user_id,
+        "title": None,
+        "messages": [],
+        "window": [],
+        "summary": [],
+        "facts": {},
+        "last_parts": [],
+        "created_at": now,
+        "updated_at": now,
+    }
+    result = await collection.insert_one(session)
+    session["_id"] = result.inserted_id
+    return session
+
+
+async def get_session(collection, session_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """The user's session, or None when it doesn't exist or belongs to someone else."""
+    try:
+        oid = ObjectId(session_id)
+    except (InvalidId, TypeError):
+        return None
+    return await collection.find_one({"_id": oid, "user_id": user_id})
+
+
+async def record_turn(
+    collection,
+    session: Dict[str, Any],
+    question: str,
+    answer: str,
+    facts: Dict[str, Any],
+    parts: Optional[List[Any]] = None,
+):
+    """Appends the exchange to the log and window, compacts the window and stores the retrieved parts."""
+    now = datetime.utcnow()
+    exchange = [{"role": "user", "content": question, "at": now}, {"role": "assistant", "content": answer, "at": now}]
+    summary, window = compact(session.get("summary", []), session.get("window", []) + exchange, facts)
+    update = {
+        "summary": summary,
+        "window": window,
+        "facts": facts,
+        "updated_at": now,
+        "title": session.get("title") or question[:80],
+    }
+    if parts is not None:
+        update["last_parts"] = [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in parts]
+    await collection.update_one(
+        {"_id": session["_id"]},
+        {"$set": update, "$push": {"messages": {"$each": exchange, "$slice": -CHAT_MAX_LOG_MESSAGES}}},
+    )
+    session.update(update)
+
+
+# --- Facts and retrieval ---
+
+def merge_facts(facts: Dict[str, Any], question: str) -> Dict[str, Any]:
+    """Session requirements updated with whatever the new question states (newest wins)."""
+    intent = parse_intent(question)
+    merged = dict(facts)
+    if intent.budget is not None:
+        merged["budget"] = intent.budget
+    if intent.socket:
+        merged["socket"] = intent.socket
+    if intent.ram_type:
+        merged["ram_type"] = intent.ram_type
+    use_case = parse_use_case(question)
+    if use_case != "balanced":
+        merged["use_case"] = use_case
+    return merged
+
+
+def describe_facts(facts: Dict[str, Any]) -> str:
+    described = []
+    if facts.get("use_case"):
+        described.append(f"{facts['use_case']} use")
+    if facts.get("budget"):
+        described.append(f"budget under ₹{facts['budget']:,.0f}")
+    if facts.get("socket"):
+        described.append(f"{facts['socket']} socket")
+    if facts.get("ram_type"):
+        described.append(f"{facts['ram_type']} RAM")
+    return ", ".join(described)
+
+
+def retrieval_query(question: str, facts: Dict[str, Any]) -> str:
+    """The question plus the session's requirements, so retrieval keeps the earlier budget/socket."""
+    described = describe_facts(facts)
+    return f"{question} ({described})" if described else question
+
+
+def explicit_categories(question: str) -> bool:
+    """True when the question names part categories (parse_intent defaults to a whole build otherwise)."""
+    return bool(mentioned_categories(question))
+
+
+def is_refinement(question: str, session: Dict[str, Any], facts: Dict[str, Any]) -> bool:
+    """
+    A follow-up that reworks the previous answer with the same parts: prior parts exist, the
+    question uses refinement phrasing, names no categories and leaves the budget/use case as they were.
+    """
+    if not session.get("last_parts") or not session.get("window"):
+        return False
+    previous = session.get("facts", {})
+    if any(facts.get(key) != previous.get(key) for key in _RETRIEVAL_FACTS):
+        return False
+    return bool(_REFINEMENT.search(question)) and not explicit_categories(question)
+
+
+def stored_parts(session: Dict[str, Any]) -> List[Any]:
+    from langchain_core.documents import Document
+    return [Document(page_content=part["page_content"], metadata=part["metadata"]) for part in session.get("last_parts", [])]
+
+
+# --- History ---
+
+def has_history(session: Dict[str, Any]) -> bool:
+    return bool(session.get("window") or session.get("summary"))
+
+
+def _quote(message: Dict[str, Any]) -> str:
+    content = message["content"].strip()
+    if len(content) > CHAT_MESSAGE_CHAR_LIMIT:
+        content = content[:CHAT_MESSAGE_CHAR_LIMIT].rsplit(" ", 1)[0] + " ..."
+    return f"{'User' if message['role'] == 'user' else 'Assistant'}: {content}"
+
+
+def render_history(summary: List[str], window: List[Dict[str, Any]], facts: Dict[str, Any]) -> str:
+    """The prompt's conversation section: known requirements, rolling summary, then recent messages."""
+    lines = []
+    described = describe_facts(facts)
+    if described:
+        lines.append(f"Known requirements: {described}.")
+    if summary:
+        lines.append(f"Earlier: {'; '.join(summary)}")
+    lines.extend(_quote(message) for message in window)
+    return "\n".join(lines)
+
+
+def _note(message: Dict[str, Any]) -> str:
+    # First line of the message, shortened: enough to recall what was asked/recommended
+    first = message["content"].strip().splitlines()[0] if message["content"].strip() else ""
+    if len(first) > SUMMARY_NOTE_CHARS:
+        first = first[:SUMMARY_NOTE_CHARS].rsplit(" ", 1)[0] + "..."
+    return f"{'user asked' if message['role'] == 'user' else 'assistant answered'} \"{first}\""
+
+
+def _trim_summary(notes: List[str]) -> List[str]:
+    # Oldest notes go first; requirements are kept separately in facts
+    while len(notes) > 1 and count_tokens("; ".join(notes)) > CHAT_SUMMARY_TOKEN_BUDGET:
+        notes.pop(0)
+    return notes
+
+
+def compact(summary: List[str], window: List[Dict[str, Any]], facts: Dict[str, Any]):
+    """Folds the oldest window messages into the summary until the history fits the token budget."""
+    notes, window = list(summary), list(window)
+    while len(window) > MIN_WINDOW_MESSAGES and count_tokens(render_history(notes, window, facts)) > CHAT_HISTORY_TOKEN_BUDGET:
+        notes.append(_note(window.pop(0)))
+        notes = _trim_summary(notes)
+    return notes, window
+
+
+def session_history(session: Dict[str, Any], facts: Dict[str, Any]) -> str:
+    return render_history(session.get("summary", []), session.get("window", []), facts)
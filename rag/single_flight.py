@@ -0,0 +1,162 @@
+"""
+Request coalescing for identical in-flight RAG questions.
+
+The first request for a (normalized) question starts one generation in a
+background task; identical requests arriving while it runs join that flight
+instead of starting their own. Every subscriber replays the chunks produced so
+far and then follows the live stream, so late streaming joiners get the whole
+answer. The generation is cancelled once its last subscriber goes away.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class GenerationCancelled(Exception):
+    """The shared generation was cancelled before it finished (all of its subscribers had left)."""
+
+
+class Flight:
+    """One shared generation: its chunks so far, completion state and subscribers."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.finished = False
+        self.cancelled = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        # What the generation shares with its subscribers besides text (e.g. the retrieved parts)
+        self.meta: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event and arm a fresh one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[Exception] = None):
+        self.finished = True
+        self.error = error
+        self._notify()
+
+    def release(self):
+        """Drops one subscriber; the generation is cancelled once none are left."""
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.finished and self.task is not None:
+            self.cancelled = True
+            self.task.cancel()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Yields every chunk from the start, then live ones until the generation ends."""
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                position += 1
+                yield self.chunks[position - 1]
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class Subscription:
+    """
+    One caller's hold on a flight. It counts as a subscriber from join() on, not
+    from its first read, so a leader leaving before a follower's response starts
+    cannot cancel the shared generation. Released when its chunks run out or are
+    closed, or by release() (e.g. as the response's background task); releasing
+    twice is a no-op.
+    """
+
+    def __init__(self, flight: Flight):
+        self.flight = flight
+        self.released = False
+        flight.subscribers += 1
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.flight.release()
+
+    async def chunks(self) -> AsyncIterator[str]:
+        try:
+            async for chunk in self.flight.follow():
+                yield chunk
+        finally:
+            self.release()
+
+    async def result(self) -> str:
+        async for _ in self.chunks():
+            pass
+        return "".join(self.flight.chunks)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    def in_flight(self, key: str) -> bool:
+        flight = self._flights.get(key)
+        return flight is not None and not flight.cancelled
+
+    def join(
+        self,
+        key: str,
+        generate: Callable[[Flight], AsyncIterator[str]],
+        on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Subscription:
+        """
+        Subscribes to the running flight for `key`, or starts one from `generate(flight)`.
+        `on_complete` runs once with the full answer when the generation succeeds.
+        """
+        flight = self._flights.get(key)
+        if flight is not None and not flight.cancelled:
+            self.joined += 1
+            return Subscription(flight)
+
+        # A cancelled flight may still be unwinding; start a fresh one rather than join it
+        flight = Flight()
+        self._flights[key] = flight
+        self.started += 1
+        subscription = Subscription(flight)
+        flight.task = asyncio.create_task(self._run(flight, generate, on_complete))
+        # Also fires for a task cancelled before it ever ran (its body, and any finally, never executes)
+        flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        return subscription
+
+    def _forget(self, key: str, flight: Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _run(self, flight: Flight, generate, on_complete):
+        try:
+            async for chunk in generate(flight):
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            # Never hand the cancellation itself to subscribers: it is a BaseException
+            # that would escape their error handling
+            flight.finish(GenerationCancelled("The answer generation was cancelled. Please try again."))
+            raise
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+            if on_complete is not None:
+                try:
+                    await on_complete("".join(flight.chunks))
+                except Exception as e:
+                    print(f"⚠️ Post-generation callback failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "started": self.started, "joined": self.joined}
+
+
+# Shared by /ask and /ask/stream, keyed on the normalized question
+rag_flights = SingleFlight()
@@ -0,0 +1,63 @@
+"""
+Server-Sent Events framing for streamed /ask answers.
+
+Each token chunk from the chain's .astream() is sent as a `data:` event; the
+stream ends with a `done` event carrying the full answer, or an `error` event.
+When the client disconnects its chunk iterator is closed; once a generation has
+no subscribers left it is cancelled (see rag/single_flight.py), which drops the
+HTTP stream to Ollama and stops generation there.
+"""
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # keep reverse proxies from buffering the stream
+}
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    lines = f"event: {event}\n" if event else ""
+    return f"{lines}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def with_completion(chunks: AsyncIterator[str], on_complete: Callable[[str], Awaitable[None]]) -> AsyncIterator[str]:
+    """Passes chunks through and calls `on_complete` with the full text once they run out (not on disconnect)."""
+    answer = []
+    try:
+        async for chunk in chunks:
+            answer.append(chunk)
+            yield chunk
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    await on_complete("".join(answer))
+
+
+async def stream_answer(chunks: AsyncIterator[str], request: Request) -> AsyncIterator[str]:
+    """Relays chain output chunks as SSE until the answer is complete or the client leaves."""
+    answer = []
+    try:
+        async for chunk in chunks:
+            if await request.is_disconnected():
+                print("Client disconnected; stopping generation.")
+                return
+            answer.append(chunk)
+            yield sse_event({"token": chunk})
+    except Exception as e:
+        print(f"Error during streamed RAG execution: {e}")
+        error = {"message": str(e)}
+        if getattr(e, "retry_after", None) is not None:
+            error["retry_after"] = e.retry_after
+        yield sse_event(error, event="error")
+        return
+    finally:
+        # Also runs when Starlette cancels the response task on disconnect
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    yield sse_event({"answer": "".join(answer)}, event="done")
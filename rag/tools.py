@@ -0,0 +1,79 @@
+"""
+The build optimizer as a RAG tool.
+
+"Best build under ₹X" questions are answered by build_optimizer.py instead of
+being left to the LLM, which is slow at them and often breaks the socket/RAM
+rules. Two ways in:
+- direct_build_answer(): a complete chat answer for full-build budget questions
+  (used by /ask before any LLM work when RAG_DIRECT_BUILD_ANSWERS is on),
+- optimizer_context(): verified builds injected into the chain's prompt (the
+  chain's pre-step; the LLM backends don't do tool calling).
+
+The branch-and-bound search is CPU-bound, so it runs on a worker thread.
+"""
+import asyncio
+import os
+import re
+from typing import List, Optional
+
+from build_optimizer import OptimizedBuild, format_build
+from database import db
+from rag.intent import parse_intent
+from routers.builds import get_build_optimizer
+
+RAG_DIRECT_BUILD_ANSWERS = os.getenv("RAG_DIRECT_BUILD_ANSWERS", "1") == "1"
+RAG_OPTIMIZER_TOP_K = int(os.getenv("RAG_OPTIMIZER_TOP_K", "2"))
+
+USE_CASE_KEYWORDS = {
+    "gaming": ("gaming", "game", "games", "fps", "esports", "1440p", "4k"),
+    "workstation": ("workstation", "editing", "rendering", "render", "blender", "3d", "streaming", "programming",
+                    "development", "machine learning", "ml", "cad"),
+    "office": ("office", "study", "school", "college", "browsing", "basic", "home use", "work from home"),
+}
+
+
+def parse_use_case(question: str) -> str:
+    text = question.lower()
+    for use_case, words in USE_CASE_KEYWORDS.items():
+        if any(re.search(rf"\b{re.escape(word)}\b", text) for word in words):
+            return use_case
+    return "balanced"
+
+
+async def optimize_for_question(question: str, top_k: int = RAG_OPTIMIZER_TOP_K) -> Optional[List[OptimizedBuild]]:
+    """Optimized builds for a full-build question with a budget; None when the question isn't one."""
+    intent = parse_intent(question)
+    if intent.budget is None or not intent.whole_build:
+        return None
+    optimizer = await get_build_optimizer(db.parts)
+    result = await asyncio.to_thread(optimizer.optimize, intent.budget, parse_use_case(question), top_k)
+    return result.builds
+
+
+async def direct_build_answer(question: str) -> Optional[str]:
+    """A finished answer for full-build budget questions, or None to fall back to the LLM."""
+    if not RAG_DIRECT_BUILD_ANSWERS:
+        return None
+    builds = await optimize_for_question(question)
+    if not builds:
+        return None
+    intent = parse_intent(question)
+    options = "\n\n".join(f"Option {n}:\n{format_build(build)}" for n, build in enumerate(builds, start=1))
+    return (
+        f"Here {'is the best compatible build' if len(builds) == 1 else 'are the best compatible builds'} "
+        f"within ₹{intent.budget:,.0f} for {parse_use_case(question)} use:\n\n{options}\n\n"
+        "Every build was checked for CPU/motherboard socket, RAM type, form factor and PSU wattage compatibility."
+    )
+
+
+async def optimizer_context(question: str) -> str:
+    """Prompt section listing verified builds (or saying there are none for this question)."""
+    try:
+        builds = await optimize_for_question(question)
+    except Exception as e:
+        print(f"⚠️ Build optimizer unavailable for RAG context: {e}")
+        builds = None
+    if not builds:
+        return "None for this question."
+    return "\n\n".join(format_build(build) for build in builds)
+
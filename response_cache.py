@@ -0,0 +1,125 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+from part_catalog import PART_CACHE_TTL_SECONDS
+
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "60"))
+
+
+class CachedResponse:
+    """A rendered JSON body with its strong ETag and any extra headers."""
+
+    __slots__ = ("body", "etag", "headers", "created_at")
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.headers = headers or {}
+        self.created_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    def to_response(self, request: Request) -> Response:
+        """200 with the cached body, or 304 when the client already holds this ETag."""
+        headers = {
+            **self.headers,
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={CATALOG_MAX_AGE_SECONDS}",
+        }
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    Byte-bounded LRU of rendered catalog responses.
+    Entries belong to one catalog version (see PartCatalog.version); the first
+    access under a newer version drops everything rendered from older data.
+    Entries also expire after `max_age_seconds` (the part cache TTL), since the
+    polling fallback misses deletes and writes that don't set `updated_at`.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, max_age_seconds: float = PART_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.version: Optional[int] = None
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+
+    def _sync_version(self, version: int):
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        self._sync_version(version)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created_at > self.max_age_seconds:
+            del self._entries[key]
+            self.size_bytes -= entry.size
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, version: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Stores a rendered body; nothing is kept if the catalog changed while it was rendered."""
+        entry = CachedResponse(body, headers)
+        if version != self.version or entry.size > self.max_bytes:
+            return entry
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous.size
+        self._entries[key] = entry
+        self.size_bytes += entry.size
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.size
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "max_age_seconds": self.max_age_seconds,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared instance used by the catalog routes
+response_cache = ResponseCache()
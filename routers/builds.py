@@ -1,200 +1,124 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
-from typing import List, Dict, Any
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import List, Dict, Any, Optional, Union
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
-from collections import defaultdict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from models.build import PCBuild, BuildItem, UserBuildsOut
 from models.part import PCPart
 from models.user import PyObjectId
 from database import get_builds_collection, get_parts_collection
 from motor.motor_asyncio import AsyncIOMotorCollection
 from auth_utils import get_current_user
-from math import ceil # Used for power calculations
-from utils import _normalize_part_doc
+from part_catalog import part_catalog
+import compatibility
+from build_optimizer import BuildOptimizer, UseCase, describe_build
+from serialization import json_response
 
 builds_router = APIRouter(tags=["PC Builds"])
 
 # --- Helper Functions (Compatibility and Retrieval) ---
 
-async def get_part_details_by_category(build: PCBuild, category: str, parts_collection: AsyncIOMotorCollection) -> List[PCPart]:
-    """Helper to quickly fetch full details for all parts of a specific category in the build."""
-    part_ids = [item.part_id for item in build.components if item.category == category]
-    if not part_ids:
-        return []
+async def resolve_parts(part_ids: List[ObjectId], parts_collection: AsyncIOMotorCollection) -> Dict[ObjectId, PCPart]:
+    """Fetches every requested part through the catalog cache (misses cost a single $in query), keyed by _id."""
+    unique_ids = list(dict.fromkeys(part_ids))
+    if not unique_ids:
+        return {}
 
-    cursor = parts_collection.find({"_id": {"$in": part_ids}})
-    part_docs = await cursor.to_list(100)
-    return [PCPart(**_normalize_part_doc(doc)) for doc in part_docs]
+    part_docs = await part_catalog.get_many(unique_ids, parts_collection)
+    return {part_id: PCPart(**doc) for part_id, doc in part_docs.items()}
 
 
-async def check_compatibility(current_build: PCBuild, new_part_doc: Dict, parts_collection: AsyncIOMotorCollection):
+async def resolve_build_parts(build: PCBuild, parts_collection: AsyncIOMotorCollection, extra_ids: List[ObjectId] = ()) -> Dict[ObjectId, PCPart]:
+    """Resolves all components of a build (plus any extra ids) in one round trip."""
+    part_ids = [item.part_id for item in build.components] + list(extra_ids)
+    return await resolve_parts(part_ids, parts_collection)
+
+
+def build_parts_from(build: PCBuild, resolved: Dict[ObjectId, PCPart]) -> compatibility.BuildParts:
+    """Pairs each resolved component of the build with its quantity, in build order."""
+    return [(resolved[item.part_id], item.quantity) for item in build.components if item.part_id in resolved]
+
+
+async def check_compatibility(current_build: PCBuild, new_part_doc: Union[Dict, PCPart], parts_collection: AsyncIOMotorCollection, resolved: Dict[ObjectId, PCPart] = None, quantity: int = 1):
     """
     Implements core compatibility logic checks.
     Raises HTTPException if a rule is violated.
+    `resolved` may carry the build's parts already fetched via resolve_build_parts.
     """
-    new_part_doc = _normalize_part_doc(new_part_doc)
-    new_part = PCPart(**new_part_doc)
-
-    # 1. CORE RULE: Check for duplicate single-instance categories
-    single_instance_categories = ["CPU", "Motherboard", "GPU", "PSU", "Case"]
-    if new_part.category in single_instance_categories:
-        if any(item.category == new_part.category for item in current_build.components):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"A {new_part.category} is already present in the build. Only one is allowed."
-            )
-
-    # 2. SOCKET COMPATIBILITY (CPU <--> Motherboard)
-    motherboards = await get_part_details_by_category(current_build, "Motherboard", parts_collection)
-    cpus = await get_part_details_by_category(current_build, "CPU", parts_collection)
-
-    # Rule 2a: Adding CPU, check existing Motherboard
-    if new_part.category == "CPU" and motherboards:
-        if new_part.socket != motherboards[0].socket:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"CPU socket ({new_part.socket}) does not match Motherboard socket ({motherboards[0].socket}).")
-
-    # Rule 2b: Adding Motherboard, check existing CPU
-    if new_part.category == "Motherboard" and cpus:
-        if new_part.socket != cpus[0].socket:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Motherboard socket ({new_part.socket}) does not match CPU socket ({cpus[0].socket}).")
-
-    # 3. RAM COMPATIBILITY (RAM <--> Motherboard)
-    rams = await get_part_details_by_category(current_build, "RAM", parts_collection)
-
-    # Rule 3a: Check RAM type (DDR4 vs DDR5)
-    if new_part.category == "RAM" and motherboards:
-        if new_part.ram_type != motherboards[0].ram_type:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"RAM type ({new_part.ram_type}) does not match Motherboard's requirement ({motherboards[0].ram_type}).")
-
-    # 4. CASE AND MOTHERBOARD FORM FACTOR (Case <--> Motherboard)
-    cases = await get_part_details_by_category(current_build, "Case", parts_collection)
-
-    # Rule 4a: Adding Motherboard, check existing Case compatibility
-    if new_part.category == "Motherboard" and cases:
-        case_support = cases[0].form_factor.split(',') # Assuming case form_factor is a comma-separated string of supported sizes (e.g., "ATX, Micro-ATX")
-        if new_part.form_factor not in case_support:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Motherboard form factor ({new_part.form_factor}) is not supported by the selected Case.")
-
-    # 5. GPU CLEARANCE (GPU <--> Case)
-    # Rule 5a: Check GPU length against Case clearance
-    if new_part.category == "GPU" and cases:
-        if new_part.length_mm is not None and cases[0].max_gpu_length_mm is not None and new_part.length_mm > cases[0].max_gpu_length_mm:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"GPU length ({new_part.length_mm}mm) exceeds Case clearance ({cases[0].max_gpu_length_mm}mm).")
-
-    # 6. PSU WATTAGE CHECK (PSU <--> All Components)
-    if new_part.category == "PSU" or new_part.category in ["CPU", "GPU"]:
-        # Recalculate total draw based on current build + new part
-        all_parts = current_build.components + [BuildItem(part_id=new_part.id, category=new_part.category)]
-
-        total_power_draw = 0
-        for item in all_parts:
-            # Skip if it's the PSU itself
-            if item.category == "PSU":
-                continue
-
-            # Fetch TDP for power-consuming parts
-            part_doc = await parts_collection.find_one({"_id": item.part_id})
-            part_details = PCPart(**_normalize_part_doc(part_doc))
-            if part_details.tdp is not None:
-                total_power_draw += part_details.tdp * item.quantity
-
-        # Add 15-20% buffer for peripherals/efficiency losses
-        REQUIRED_WATTAGE = ceil(total_power_draw * 1.20)
-
-        # Identify the PSU currently in the list
-        psu = next((item for item in all_parts if item.category == "PSU"), None)
-
-        if psu:
-            psu_doc = await parts_collection.find_one({"_id": psu.part_id})
-            psu_details = PCPart(**_normalize_part_doc(psu_doc))
-
-            if psu_details.wattage is not None and psu_details.wattage < REQUIRED_WATTAGE:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"PSU wattage ({psu_details.wattage}W) is insufficient. Total required wattage (with 20% buffer) is at least {REQUIRED_WATTAGE}W.")
+    if isinstance(new_part_doc, PCPart):
+        new_part = new_part_doc
+    else:
+        new_part = PCPart(**new_part_doc)
+
+    if resolved is None:
+        resolved = await resolve_build_parts(current_build, parts_collection)
+
+    issues = compatibility.check_part(new_part, build_parts_from(current_build, resolved), quantity)
+    if issues:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=issues[0]["message"])
 
     return True # Compatibility check passed!
 
 
-async def evaluate_build_compatibility(build: PCBuild, parts_collection: AsyncIOMotorCollection) -> Dict[str, Any]:
+async def evaluate_build_compatibility(build: PCBuild, parts_collection: AsyncIOMotorCollection, resolved: Dict[ObjectId, PCPart] = None) -> Dict[str, Any]:
     """
     Runs compatibility checks across the existing build and returns a summarized report.
+    `resolved` may carry the build's parts already fetched via resolve_build_parts.
     """
-    issues: List[Dict[str, str]] = []
-    grouped: Dict[str, List[PCPart]] = defaultdict(list)
-
-    # Fetch all part documents for reuse
-    part_docs: Dict[ObjectId, PCPart] = {}
-    for item in build.components:
-        doc = await parts_collection.find_one({"_id": item.part_id})
-        if not doc:
-            issues.append({"type": "error", "message": f"Component {item.part_id} is missing from catalog."})
-            continue
-        part = PCPart(**_normalize_part_doc(doc))
-        part_docs[item.part_id] = part
-        grouped[part.category].append(part)
-
-    single_instance_categories = {"CPU", "Motherboard", "GPU", "PSU", "Case"}
-    for category in single_instance_categories:
-        if len(grouped.get(category, [])) > 1:
-            issues.append({"type": "error", "message": f"Multiple {category} components detected. Only one is allowed."})
-
-    # Socket checks
-    cpu = grouped.get("CPU", [None])[0]
-    motherboard = grouped.get("Motherboard", [None])[0]
-    if cpu and motherboard and cpu.socket != motherboard.socket:
-        issues.append({"type": "error", "message": f"CPU socket ({cpu.socket}) does not match Motherboard socket ({motherboard.socket})."})
-
-    # RAM type check
-    ram = grouped.get("RAM", [])
-    if ram and motherboard and ram[0].ram_type and motherboard.ram_type and ram[0].ram_type != motherboard.ram_type:
-        issues.append({"type": "error", "message": f"RAM type ({ram[0].ram_type}) does not match Motherboard requirement ({motherboard.ram_type})."})
-
-    # Case form factor
-    case = grouped.get("Case", [None])[0]
-    if case and motherboard and motherboard.form_factor:
-        supported = [ff.strip() for ff in case.form_factor.split(",")]
-        if motherboard.form_factor not in supported:
-            issues.append({"type": "error", "message": f"Motherboard form factor ({motherboard.form_factor}) is not supported by selected Case."})
-
-    # GPU length vs Case
-    gpu = grouped.get("GPU", [None])[0]
-    if gpu and case and gpu.length_mm and case.max_gpu_length_mm and gpu.length_mm > case.max_gpu_length_mm:
-        issues.append({"type": "warning", "message": f"GPU length ({gpu.length_mm}mm) is close to/exceeds case clearance ({case.max_gpu_length_mm}mm)."})
-
-    # PSU wattage
-    psu = grouped.get("PSU", [None])[0]
-    if psu:
-        total_draw = 0
-        for part in part_docs.values():
-            if part.category == "PSU":
-                continue
-            if part.tdp:
-                total_draw += part.tdp
-        required = ceil(total_draw * 1.2)
-        if psu.wattage and psu.wattage < required:
-            issues.append({"type": "error", "message": f"PSU wattage ({psu.wattage}W) is below recommended {required}W for current parts."})
-
-    status = "success"
-    if any(i["type"] == "error" for i in issues):
-        status = "error"
-    elif any(i["type"] == "warning" for i in issues):
-        status = "warning"
-
-    return {"status": status, "issues": issues}
-
-
-def _normalize_part_doc(part_doc: Dict[str, Any]) -> Dict[str, Any]:
-    """Ensure price is numeric and compatible with PCPart model."""
-    if part_doc and isinstance(part_doc.get("price"), str):
+    if resolved is None:
+        resolved = await resolve_build_parts(build, parts_collection)
+
+    issues: List[Dict[str, str]] = [
+        {"type": "error", "message": f"Component {item.part_id} is missing from catalog."}
+        for item in build.components if item.part_id not in resolved
+    ]
+    issues.extend(compatibility.evaluate_parts(build_parts_from(build, resolved)))
+    return compatibility.summarize(issues)
+
+
+def snapshot_parts(docs: List[Dict[str, Any]]) -> List[PCPart]:
+    """Catalog documents as PCPart, skipping (and logging) invalid ones so one bad part can't break the whole index."""
+    parts = []
+    for doc in docs:
         try:
-            part_doc["price"] = float(part_doc["price"].replace("₹", "").replace(",", ""))
-        except Exception:
-            part_doc["price"] = 0.0
-    return part_doc
+            parts.append(PCPart(**doc))
+        except ValidationError as e:
+            print(f"⚠️ Skipping invalid part {doc.get('_id')} ({doc.get('name')!r}): {e.error_count()} validation error(s)")
+    return parts
+
+
+_compatibility_index: Optional[compatibility.CompatibilityIndex] = None
+
+
+async def get_compatibility_index(parts_collection: AsyncIOMotorCollection) -> compatibility.CompatibilityIndex:
+    """Returns the compatibility index, rebuilding it only when the catalog snapshot changes."""
+    global _compatibility_index
+    docs = await part_catalog.snapshot(parts_collection)
+    if _compatibility_index is None or _compatibility_index.source is not docs:
+        _compatibility_index = compatibility.CompatibilityIndex(snapshot_parts(docs), source=docs)
+    return _compatibility_index
+
+
+_build_optimizer: Optional[BuildOptimizer] = None
+
+
+async def get_build_optimizer(parts_collection: AsyncIOMotorCollection) -> BuildOptimizer:
+    """Returns the build optimizer, rebuilding it only when the catalog snapshot changes."""
+    global _build_optimizer
+    docs = await part_catalog.snapshot(parts_collection)
+    if _build_optimizer is None or _build_optimizer.source is not docs:
+        _build_optimizer = BuildOptimizer(snapshot_parts(docs), source=docs)
+    return _build_optimizer
+
+
+class OptimizeRequest(BaseModel):
+    budget: float = Field(..., gt=0, description="Total budget in rupees.")
+    use_case: UseCase = "gaming"
+    top_k: int = Field(3, ge=1, le=10)
+    categories: Optional[List[str]] = Field(None, description="Slots to fill; defaults to every category in the catalog.")
 
 
 class BuildItemIn(BaseModel):
@@ -208,13 +132,12 @@ async def hydrate_build(build_doc: Dict[str, Any], parts_collection: AsyncIOMoto
     Returns a dict containing the build, full part details, compatibility summary and totals.
     """
     build = PCBuild(**build_doc)
-    parts: List[PCPart] = []
-    for item in build.components:
-        part_doc = await parts_collection.find_one({"_id": item.part_id})
-        if part_doc:
-            parts.append(PCPart(**_normalize_part_doc(part_doc)))
 
-    compatibility = await evaluate_build_compatibility(build, parts_collection)
+    # One $in query for the whole build, shared with the compatibility report
+    resolved = await resolve_build_parts(build, parts_collection)
+    parts: List[PCPart] = [resolved[item.part_id] for item in build.components if item.part_id in resolved]
+
+    compatibility = await evaluate_build_compatibility(build, parts_collection, resolved)
     total_price = sum(part.price for part in parts if part.price)
 
     return {
@@ -241,11 +164,30 @@ async def create_build(
     result = await builds.insert_one(build_dict)
     new_build = await builds.find_one({"_id": result.inserted_id})
     build = PCBuild(**new_build)
-    encoded = jsonable_encoder(build, custom_encoder={ObjectId: str})
-    return JSONResponse(content=encoded, status_code=status.HTTP_201_CREATED)
+    return json_response(build, status_code=status.HTTP_201_CREATED)
 
 
 
+@builds_router.post("/builds/optimize")
+async def optimize_builds(
+    request: OptimizeRequest,
+    parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
+):
+    """
+    Returns the top-K fully compatible builds within budget for a use case,
+    computed by the branch-and-bound optimizer (no LLM involved).
+    """
+    optimizer = await get_build_optimizer(parts_collection)
+    # Pure CPU work; keep it off the event loop for large catalogs
+    result = await asyncio.to_thread(optimizer.optimize, request.budget, request.use_case, request.top_k, request.categories)
+    return json_response({
+        "budget": request.budget,
+        "use_case": request.use_case,
+        "builds": [describe_build(build) for build in result.builds],
+        "search": {"nodes": result.nodes, "exhaustive": result.exhaustive},
+    })
+
+
 @builds_router.get("/builds/active")
 async def get_user_builds(
     current_user: Dict[str, Any] = Depends(get_current_user),
@@ -284,8 +226,7 @@ async def get_user_builds(
         builds_list.append(PCBuild(**build_doc))
 
     result = UserBuildsOut(active_build=active_build, builds=builds_list)
-    encoded = jsonable_encoder(result, custom_encoder={ObjectId: str})
-    return JSONResponse(content=encoded)
+    return json_response(result)
 
 
 @builds_router.post("/builds/{build_id}/add")
@@ -316,12 +257,14 @@ async def add_component_to_build(
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid part id.")
 
-    part_doc = await parts_collection.find_one({"_id": part_oid})
-    if not part_doc:
+    # Resolve the new part together with the existing components in one round trip
+    resolved = await resolve_build_parts(current_build, parts_collection, extra_ids=[part_oid])
+    new_part = resolved.get(part_oid)
+    if new_part is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Component not found in catalog.")
 
     # 3. RUN COMPATIBILITY CHECK
-    await check_compatibility(current_build, part_doc, parts_collection)
+    await check_compatibility(current_build, new_part, parts_collection, resolved, item.quantity)
 
     # 4. Update MongoDB (Atomically add component)
     update_result = await builds.update_one(
@@ -337,8 +280,7 @@ async def add_component_to_build(
 
     updated_build_doc = await builds.find_one({"_id": b_id})
     build = PCBuild(**updated_build_doc)
-    encoded = jsonable_encoder(build, custom_encoder={ObjectId: str})
-    return JSONResponse(content=encoded)
+    return json_response(build)
 
 
 @builds_router.delete("/builds/{build_id}/remove/{part_id}")
@@ -373,8 +315,7 @@ async def remove_component_from_build(
 
     updated_build_doc = await builds.find_one({"_id": b_id})
     build = PCBuild(**updated_build_doc)
-    encoded = jsonable_encoder(build, custom_encoder={ObjectId: str})
-    return JSONResponse(content=encoded)
+    return json_response(build)
 
 
 @builds_router.get("/builds/{build_id}/details")
@@ -397,5 +338,31 @@ async def get_build_details(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Build not found or not owned by user.")
 
     data = await hydrate_build(build_doc, parts_collection)
-    encoded = jsonable_encoder(data, custom_encoder={ObjectId: str})
-    return JSONResponse(content=encoded)
+    return json_response(data)
+
+
+@builds_router.get("/builds/{build_id}/compatible-parts")
+async def get_compatible_parts(
+    build_id: str,
+    category: str = Query(..., description="Part category to list, e.g. CPU, RAM, GPU"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    builds: AsyncIOMotorCollection = Depends(get_builds_collection),
+    parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
+):
+    """
+    Lists the parts of a category that pass every compatibility rule against the current build.
+    """
+    try:
+        b_id = ObjectId(build_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid build id.")
+
+    build_doc = await builds.find_one({"_id": b_id, "user_id": ObjectId(current_user["user_id"])})
+    if not build_doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Build not found or not owned by user.")
+
+    build = PCBuild(**build_doc)
+    resolved = await resolve_build_parts(build, parts_collection)
+    index = await get_compatibility_index(parts_collection)
+    parts = index.candidates(category, build_parts_from(build, resolved))
+    return json_response(parts)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, Annotated, List
+from motor.motor_asyncio import AsyncIOMotorCollection
+from auth_utils import get_current_user
+from database import get_chat_sessions_collection
+from models.chat import ChatSessionOut, ChatSessionSummary
+from rag.sessions import get_session
+
+chat_router = APIRouter(tags=["Assistant Chat"])
+
+# --- Chat Session Endpoints (logs written by /ask and /ask/stream) ---
+
+@chat_router.get("/sessions", response_model=List[ChatSessionSummary])
+async def list_chat_sessions(
+    current_user: Annotated[Dict[str, Any], Depends(get_current_user)],
+    sessions: AsyncIOMotorCollection = Depends(get_chat_sessions_collection),
+):
+    """The user's chat sessions, most recently active first."""
+    cursor = sessions.find(
+        {"user_id": current_user["user_id"]},
+        projection={"title": 1, "created_at": 1, "updated_at": 1},
+    ).sort("updated_at", -1).limit(50)
+    return [ChatSessionSummary(**doc) async for doc in cursor]
+
+
+@chat_router.get("/sessions/{session_id}", response_model=ChatSessionOut)
+async def get_chat_session(
+    session_id: str,
+    current_user: Annotated[Dict[str, Any], Depends(get_current_user)],
+    sessions: AsyncIOMotorCollection = Depends(get_chat_sessions_collection),
+):
+    """One session's chat log and condensed memory."""
+    session = await get_session(sessions, session_id, current_user["user_id"])
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found.")
+    return ChatSessionOut(**session)
+
+
+@chat_router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_chat_session(
+    session_id: str,
+    current_user: Annotated[Dict[str, Any], Depends(get_current_user)],
+    sessions: AsyncIOMotorCollection = Depends(get_chat_sessions_collection),
+):
+    """Deletes a session and its log; the next question starts a fresh conversation."""
+    session = await get_session(sessions, session_id, current_user["user_id"])
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat session not found.")
+    await sessions.delete_one({"_id": session["_id"]})
@@ -1,23 +1,50 @@
 # routers/parts.py
-from fastapi import APIRouter, Depends, Query, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+from bson import ObjectId
 from models.part import PCPart, PartFilterParams
 from database import get_parts_collection
 from motor.motor_asyncio import AsyncIOMotorCollection
-from utils import _normalize_part_doc
+from part_catalog import part_catalog
+from response_cache import response_cache
+from serialization import PART_PROJECTION, dumps, dumps_parts, part_to_json_dict
 
 parts_router = APIRouter(tags=["PC Parts Catalog"])
 
-@parts_router.get(
-    "/parts",
-    response_model=List[PCPart],
-    summary="List PC parts with filtering, sorting, and pagination"
-)
-async def list_pc_parts(
-    # Use Query parameters for complex filtering/sorting
-    filters: PartFilterParams = Depends(),
-    parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
-):
+def encode_cursor(filters: PartFilterParams, last_doc: Dict[str, Any]) -> str:
+    """Opaque token for the (sort key value, _id) of the last document on a page."""
+    payload = [filters.sort_by, filters.sort_order, last_doc.get(filters.sort_by), str(last_doc["_id"])]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(filters: PartFilterParams) -> Tuple[Any, ObjectId]:
+    try:
+        padded = filters.cursor + "=" * (-len(filters.cursor) % 4)
+        sort_by, sort_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor.")
+    if sort_by != filters.sort_by or sort_order != filters.sort_order:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor does not match the requested sort.")
+    return value, last_id
+
+
+def keyset_condition(sort_by: str, sort_order: int, value: Any, last_id: ObjectId) -> Dict[str, Any]:
+    """Range condition selecting documents strictly after (value, last_id) in the sort order."""
+    # Mongo sorts null/missing before every other value, and range operators never match null
+    if sort_order == 1:
+        if value is None:
+            return {"$or": [{sort_by: None, "_id": {"$gt": last_id}}, {sort_by: {"$ne": None}}]}
+        return {"$or": [{sort_by: {"$gt": value}}, {sort_by: value, "_id": {"$gt": last_id}}]}
+    if value is None:
+        return {sort_by: None, "_id": {"$lt": last_id}}
+    return {"$or": [{sort_by: {"$lt": value}}, {sort_by: value, "_id": {"$lt": last_id}}, {sort_by: None}]}
+
+
+def build_parts_query(filters: PartFilterParams) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """Translates the filter params into a Mongo filter and sort (shared with check_query_plans.py)."""
     # 1. Build the MongoDB Query ($match)
     query = {}
     if filters.category:
@@ -29,22 +56,53 @@ async def list_pc_parts(
         if filters.max_price is not None:
             price_query["$lte"] = filters.max_price
         query["price"] = price_query
-    
-    # 2. Build the Sort criteria ($sort)
-    sort_criteria = [(filters.sort_by, filters.sort_order)]
-    
-    # 3. Execute the Query
-    parts_cursor = parts_collection.find(query).sort(sort_criteria).skip(filters.skip).limit(filters.limit)
-    
+
+    # Keyset pagination: continue after the last (sort key, _id) of the previous page
+    if filters.cursor:
+        value, last_id = decode_cursor(filters)
+        query = {"$and": [query, keyset_condition(filters.sort_by, filters.sort_order, value, last_id)]}
+
+    # 2. Build the Sort criteria ($sort), with _id as a unique tie-breaker
+    sort_criteria = [(filters.sort_by, filters.sort_order), ("_id", filters.sort_order)]
+    return query, sort_criteria
+
+
+@parts_router.get(
+    "/parts",
+    response_model=List[PCPart],
+    summary="List PC parts with filtering, sorting, and pagination"
+)
+async def list_pc_parts(
+    request: Request,
+    # Use Query parameters for complex filtering/sorting
+    filters: PartFilterParams = Depends(),
+    parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
+):
+    # Serve the rendered page (or a 304) if this exact filter set was seen for the current catalog version
+    version = part_catalog.version
+    cache_key = ("parts", tuple(sorted(filters.model_dump().items())))
+    cached = response_cache.get(cache_key, version)
+    if cached is not None:
+        return cached.to_response(request)
+
+    query, sort_criteria = build_parts_query(filters)
+
+    # 3. Execute the Query (skip is only honoured for clients that don't send a cursor yet)
+    parts_cursor = parts_collection.find(query, projection=PART_PROJECTION).sort(sort_criteria)
+    if not filters.cursor and filters.skip:
+        parts_cursor = parts_cursor.skip(filters.skip)
+    parts_cursor = parts_cursor.limit(filters.limit)
+
     parts_list = await parts_cursor.to_list(length=filters.limit)
 
-    # Process parts to clean price strings
-    for part in parts_list:
-        if 'price' in part and isinstance(part['price'], str):
-            # Remove ₹ and commas, convert to float
-            part['price'] = float(part['price'].replace('₹', '').replace(',', ''))
+    # A full page means there may be more; hand back where to continue from
+    headers = {}
+    if len(parts_list) == filters.limit:
+        headers["X-Next-Cursor"] = encode_cursor(filters, parts_list[-1])
 
-    return [PCPart(**part) for part in parts_list]
+    # Raw documents go straight to JSON bytes; the projection already matches PCPart
+    body = dumps_parts(parts_list)
+    return response_cache.put(cache_key, version, body, headers).to_response(request)
 
 
 @parts_router.get(
@@ -52,11 +110,26 @@ async def list_pc_parts(
     summary="Get a list of all distinct PC part categories"
 )
 async def get_part_categories(
+    request: Request,
     parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
 ):
+    version = part_catalog.version
+    cached = response_cache.get(("categories",), version)
+    if cached is not None:
+        return cached.to_response(request)
+
     # Use MongoDB's distinct command to get unique values from the 'category' field
     categories = await parts_collection.distinct("category")
-    return {"categories": categories}
+    body = dumps({"categories": categories})
+    return response_cache.put(("categories",), version, body).to_response(request)
+
+
+@parts_router.get(
+    "/parts/cache/stats",
+    summary="Hit/miss counters for the part catalog and response caches"
+)
+async def get_part_cache_stats():
+    return {"catalog": part_catalog.stats(), "responses": response_cache.stats()}
 
 
 @parts_router.get(
@@ -66,18 +139,24 @@ async def get_part_categories(
 )
 async def get_part_details(
     part_id: str,
+    request: Request,
     parts_collection: AsyncIOMotorCollection = Depends(get_parts_collection)
 ):
-    from bson import ObjectId
-    
     try:
         object_id = ObjectId(part_id)
     except Exception:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Part ID format.")
 
-    part_doc = await parts_collection.find_one({"_id": object_id})
-    
+    version = part_catalog.version
+    cache_key = ("part", object_id)
+    cached = response_cache.get(cache_key, version)
+    if cached is not None:
+        return cached.to_response(request)
+
+    part_doc = await part_catalog.get(object_id, parts_collection)
+
     if part_doc is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PC Part not found.")
 
-    return PCPart(**part_doc)
\ No newline at end of file
+    body = dumps(part_to_json_dict(part_doc))
+    return response_cache.put(cache_key, version, body).to_response(request)
\ No newline at end of file
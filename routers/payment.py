@@ -6,25 +6,34 @@ from payment_service import client, RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET
 from database import get_builds_collection, get_parts_collection
 from auth_utils import get_current_user
 from models.build import PCBuild
-from utils import _normalize_part_doc
+from part_catalog import part_catalog
 import hmac
 import hashlib
 from datetime import datetime
 
 payment_router = APIRouter(tags=["Payments"])
 
-async def calculate_final_price(build: PCBuild, parts_collection) -> float:
-    """Calculate the total price of the build."""
-    total_price = 0.0
+def part_price_paise(part: Dict[str, Any]) -> int:
+    """The part's stored price in paise; unmigrated parts are a deployment error (see migrate_prices.py)."""
+    price_paise = part.get("price_paise")
+    if price_paise is None:
+        print(f"❌ Part {part.get('_id')} has no price_paise; run `python migrate_prices.py`.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Part prices are being updated. Please try again later.",
+        )
+    return price_paise
+
+
+async def calculate_final_price_paise(build: PCBuild, parts_collection) -> int:
+    """Calculate the total price of the build in paise (exact integer arithmetic)."""
+    total_paise = 0
+    part_docs = await part_catalog.get_many([item.part_id for item in build.components], parts_collection)
     for item in build.components:
-        part_doc = await parts_collection.find_one({"_id": item.part_id})
-        if part_doc:
-            part = _normalize_part_doc(part_doc)
-            price = part.get("price", 0.0)
-            if isinstance(price, str):
-                price = float(price.replace("₹", "").replace(",", ""))
-            total_price += price * item.quantity
-    return total_price
+        part = part_docs.get(item.part_id)
+        if part:
+            total_paise += part_price_paise(part) * item.quantity
+    return total_paise
 
 @payment_router.post("/create-order/{build_id}")
 async def create_order(
@@ -44,10 +53,8 @@ async def create_order(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Build not found or not owned by user.")
 
     build = PCBuild(**build_doc)
-    total_price = await calculate_final_price(build, parts_collection)
-
-    # Convert to paise (Razorpay uses paise)
-    amount_in_paise = int(total_price * 100)
+    # Razorpay amounts are in paise, which is how part prices are stored
+    amount_in_paise = await calculate_final_price_paise(build, parts_collection)
 
     # Create order data
     order_data = {
@@ -0,0 +1,47 @@
+"""
+Fast JSON rendering for API responses.
+
+Catalog reads go straight from raw Mongo documents (fetched with PART_PROJECTION)
+to JSON bytes through orjson, skipping PCPart construction, FastAPI's
+response_model revalidation and jsonable_encoder. bench_serialization.py compares
+this path with the model-based one.
+"""
+from typing import Any, Dict, Iterable, List
+
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from pydantic import BaseModel
+
+from models.part import PCPart
+
+# Output keys of a serialized PCPart, in model order ("_id" is the alias of `id`)
+PART_FIELDS: List[str] = [field.alias or name for name, field in PCPart.model_fields.items()]
+PART_PROJECTION: Dict[str, int] = {field: 1 for field in PART_FIELDS}
+
+
+def _default(obj: Any) -> Any:
+    """orjson hook for the types it doesn't encode natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+def part_to_json_dict(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Shapes a raw part document like a serialized PCPart (every field present, None when unset)."""
+    return {field: doc.get(field) for field in PART_FIELDS}
+
+
+def dumps_parts(docs: Iterable[Dict[str, Any]]) -> bytes:
+    return dumps([part_to_json_dict(doc) for doc in docs])
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """Drop-in for JSONResponse(jsonable_encoder(content, custom_encoder={ObjectId: str}))."""
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json")
@@ -0,0 +1,132 @@
+"""
+Parses the free-text `specs` strings from database.json into the typed PCPart
+fields (socket, ram_type, tdp, wattage, ...). Used once at ingest time by
+ingest_parts.py and create_local_db.py so request-time code never has to.
+"""
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, Optional, Union
+
+from compatibility import canonical_category
+
+# Bump when the extraction rules change so the next ingest re-parses every part
+PARSER_VERSION = 1
+
+SOURCE_FIELDS = ("category", "name", "price", "specs", "image")
+
+_SOCKET = re.compile(r'\b(AM5|AM4|LGA\s?1851|LGA\s?1700|LGA\s?1200)\b', re.IGNORECASE)
+_RAM_TYPE = re.compile(r'\b(DDR[345])\b', re.IGNORECASE)
+_FORM_FACTOR = re.compile(r'\b(E-ATX|Micro-ATX|mATX|Mini-ITX|ATX)\b', re.IGNORECASE)
+_CORES = re.compile(r'(\d+)\s*Cores\b', re.IGNORECASE)
+_TDP = re.compile(r'(\d+)\s*W\s*TDP\b', re.IGNORECASE)
+_WATTAGE = re.compile(r'(\d+)\s*W\b', re.IGNORECASE)
+_SPEED_MHZ = re.compile(r'(\d+)\s*MHz\b', re.IGNORECASE)
+_LENGTH_MM = re.compile(r'(\d+(?:\.\d+)?)\s*mm\b', re.IGNORECASE)
+_GPU_CLEARANCE_MM = re.compile(r'(\d+(?:\.\d+)?)\s*mm\s*GPU', re.IGNORECASE)
+
+_FORM_FACTOR_NAMES = {"e-atx": "E-ATX", "micro-atx": "Micro-ATX", "matx": "Micro-ATX", "mini-itx": "Mini-ITX", "atx": "ATX"}
+
+
+def _first(pattern: re.Pattern, text: str, cast: Callable = str) -> Optional[Any]:
+    match = pattern.search(text)
+    return cast(match.group(1)) if match else None
+
+
+def _socket(text: str) -> Optional[str]:
+    socket = _first(_SOCKET, text)
+    return socket.upper().replace(" ", "") if socket else None
+
+
+def _ram_type(text: str) -> Optional[str]:
+    ram_type = _first(_RAM_TYPE, text)
+    return ram_type.upper() if ram_type else None
+
+
+def _form_factor(text: str) -> Optional[str]:
+    form_factor = _first(_FORM_FACTOR, text)
+    return _FORM_FACTOR_NAMES[form_factor.lower()] if form_factor else None
+
+
+def _supported_form_factors(text: str) -> Optional[str]:
+    # Cases list every board size they take; keep them as the comma-separated string the rules expect
+    names = dict.fromkeys(_FORM_FACTOR_NAMES[m.lower()] for m in _FORM_FACTOR.findall(text))
+    return ", ".join(names) or None
+
+
+# Which typed fields to extract for each (canonical) category
+_EXTRACTORS: Dict[str, Dict[str, Callable[[str], Any]]] = {
+    "CPU": {
+        "socket": _socket,
+        "cores": lambda text: _first(_CORES, text, int),
+        "tdp": lambda text: _first(_TDP, text, int),
+    },
+    "Motherboard": {
+        "socket": _socket,
+        "ram_type": _ram_type,
+        "form_factor": _form_factor,
+        "max_ram_speed_mhz": lambda text: _first(_SPEED_MHZ, text, int),
+    },
+    "RAM": {
+        "ram_type": _ram_type,
+    },
+    "GPU": {
+        "tdp": lambda text: _first(_TDP, text, int),
+        "length_mm": lambda text: _first(_LENGTH_MM, text, float),
+    },
+    "PSU": {
+        "wattage": lambda text: _first(_WATTAGE, text, int),
+    },
+    "Case": {
+        "form_factor": _supported_form_factors,
+        "max_gpu_length_mm": lambda text: _first(_GPU_CLEARANCE_MM, text, float),
+    },
+}
+
+TYPED_FIELDS = sorted({field for fields in _EXTRACTORS.values() for field in fields})
+
+
+def parse_price(value: Union[str, int, float, None]) -> Optional[float]:
+    """'₹39,757' -> 39757.0; numbers pass through."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value.replace("₹", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def price_fields(value: Union[str, int, float, None]) -> Dict[str, Any]:
+    """
+    The stored price representation: `price_paise` (int, authoritative) plus
+    `price` in rupees derived from it for filtering, sorting and the API.
+    """
+    rupees = parse_price(value)
+    if rupees is None:
+        return {"price": None, "price_paise": None}
+    paise = int(round(rupees * 100))
+    return {"price": paise / 100, "price_paise": paise}
+
+
+def parse_specs(category: str, specs: str) -> Dict[str, Any]:
+    """Returns every typed field for the category (None where the specs don't say)."""
+    extractors = _EXTRACTORS.get(canonical_category(category), {})
+    return {field: extract(specs or "") for field, extract in extractors.items()}
+
+
+def content_hash(item: Dict[str, Any]) -> str:
+    """Stable hash of the source fields (plus parser version) used to skip unchanged parts."""
+    source = {field: item.get(field) for field in SOURCE_FIELDS}
+    payload = json.dumps([PARSER_VERSION, source], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_part(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the Mongo document for a raw catalog entry: source fields, typed specs and spec_hash."""
+    doc = {field: item[field] for field in SOURCE_FIELDS if field in item}
+    doc.update(price_fields(item.get("price")))
+    # Every typed field is written so a re-parse also clears values that no longer apply
+    doc.update({field: None for field in TYPED_FIELDS})
+    doc.update(parse_specs(item["category"], item.get("specs", "")))
+    doc["spec_hash"] = content_hash(item)
+    return doc